@@ -0,0 +1,56 @@
+"""Microbenchmark: messages/sec parsed by LineFramer under a POS| burst.
+
+Run from the repository root:
+
+    python3 benchmarks/bench_framing.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from protocol import LineFramer
+
+
+def build_burst(messages):
+    lines = []
+    for i in range(messages):
+        if i % 50 == 0:
+            lines.append("TEXT|Zażółć gęślą jaźń – the quick brown fox jumps over the lazy dog.$" * 4)
+        else:
+            lines.append(f"POS| {i / messages:.6f}|alice 0.500000|bob 0.250000|carol 0.125000|dave")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def split_chunks(data, chunk_size, seed=1):
+    rng = random.Random(seed)
+    chunks = []
+    i = 0
+    while i < len(data):
+        size = rng.randint(1, chunk_size)
+        chunks.append(data[i:i + size])
+        i += size
+    return chunks
+
+
+def run(messages=100000, chunk_size=1024):
+    payload = build_burst(messages)
+    chunks = split_chunks(payload, chunk_size)
+
+    framer = LineFramer()
+    parsed = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        parsed += len(framer.feed(chunk))
+    elapsed = time.perf_counter() - start
+
+    assert parsed == messages, (parsed, messages)
+    return parsed / elapsed
+
+
+if __name__ == '__main__':
+    for chunk_size in (64, 1024, 65536):
+        rate = run(chunk_size=chunk_size)
+        print(f"chunk<= {chunk_size:6d} B: {rate:,.0f} messages/s")
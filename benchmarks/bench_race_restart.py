@@ -0,0 +1,107 @@
+"""Race-start latency and memory over back-to-back races.
+
+Drives a Client through TEXT|/START|/END| without a server, the way a room
+that keeps pressing "Play Again" would. For every race it measures the time
+from START| to the first painted frame of the race view, and it samples
+RSS, Python heap (tracemalloc) and the number of live QObjects under the
+window to show whether anything grows from race to race.
+
+Run from the repository root:
+
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_race_restart.py --races 100
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+
+import klient
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return 0
+
+
+def load_texts():
+    texts = []
+    for name in sorted(os.listdir("resources/text")):
+        with open(os.path.join("resources/text", name), encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+
+def run_race(app, client, text, start_payload, end_payload):
+    painted = []
+
+    def first_frame():
+        painted.append(time.perf_counter())
+
+    client.dispatchMessage(f"TEXT|{text}")
+    started = time.perf_counter()
+    client.startRace(start_payload)
+    client.bg_widget.first_frame.connect(first_frame)
+    deadline = started + 2.0
+    while not painted and time.perf_counter() < deadline:
+        app.processEvents()
+    client.bg_widget.first_frame.disconnect(first_frame)
+    client.showRanking(end_payload)
+    app.processEvents()
+    # processEvents() leaves deleteLater()ed objects alone; exec() would delete them.
+    app.sendPostedEvents(None, QEvent.DeferredDelete)
+    return (painted[0] - started) if painted else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--races", type=int, default=100)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    rng = random.Random(args.seed)
+    texts = load_texts()
+    nicknames = ["alice", "bob", "carol", "dave"][:args.players]
+
+    client = klient.Client()
+    client.login_dialog.hide()
+    client.player_id = nicknames[0]
+    client.is_admin = True
+    client.telemetry_dir = "off"
+
+    tracemalloc.start()
+    samples = []
+    latencies = []
+    for race in range(1, args.races + 1):
+        cars = rng.sample(range(1, 13), len(nicknames))
+        start_payload = f"{len(nicknames)}" + "".join(f" {car}|{nick}" for car, nick in zip(cars, nicknames))
+        end_payload = "".join(f"{nick}|" for nick in nicknames)
+        latencies.append(run_race(app, client, rng.choice(texts), start_payload, end_payload) * 1000)
+        if race in (1, 10, 25, 50, 75, 100) or race == args.races:
+            samples.append((race, rss_kb(), tracemalloc.get_traced_memory()[0] // 1024,
+                            len(client.findChildren(QObject))))
+
+    first = latencies[0]
+    rest = sorted(latencies[1:]) or [first]
+    print(f"race start -> first frame: first {first:.1f} ms, then median {statistics.median(rest):.1f} ms, "
+          f"p95 {rest[int(len(rest) * 0.95) - 1]:.1f} ms, max {rest[-1]:.1f} ms")
+    print(f"{'race':>6} {'RSS KB':>10} {'py heap KB':>11} {'QObjects':>9}")
+    for race, rss, heap, objects in samples:
+        print(f"{race:>6} {rss:>10} {heap:>11} {objects:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""POS| fan-out throughput of a TypeRacer server.
+
+Fills rooms of four raw protocol clients, starts every race and has each
+client send UPDATE| as fast as the connection accepts for a fixed time.
+Reports UPDATE|s sent and POS| lines delivered per second.
+
+By default the Python reference server (serwer.py) is started in-process.
+To measure the C++ binary, start ./serwer and pass its port:
+
+    python3 benchmarks/bench_server_fanout.py
+    python3 benchmarks/bench_server_fanout.py --port 12437
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protocol
+import serwer
+from protocol import LineFramer, MAX_PLAYERS_PER_ROOM
+
+
+class Counter:
+    def __init__(self):
+        self.updates = 0
+        self.positions = 0
+        self.measuring = False
+
+
+async def read_until(reader, framer, command):
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            raise ConnectionError("closed")
+        for msg in framer.feed(data):
+            if msg.startswith(command + "|"):
+                return msg
+
+
+async def count_positions(reader, framer, counter):
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            return
+        if counter.measuring:
+            counter.positions += sum(1 for msg in framer.feed(data) if msg.startswith("POS|"))
+        else:
+            framer.feed(data)
+
+
+async def open_room(host, port, room_index):
+    clients = []
+    for slot in range(MAX_PLAYERS_PER_ROOM):
+        reader, writer = await asyncio.open_connection(host, port)
+        framer = LineFramer()
+        writer.write(protocol.login(f"fan{room_index:04d}_{slot}").encode())
+        await read_until(reader, framer, "ROOMS")
+        clients.append((reader, writer, framer))
+
+    admin_reader, admin_writer, admin_framer = clients[0]
+    admin_writer.write(protocol.create_room().encode())
+    room_id = int((await read_until(admin_reader, admin_framer, "CREATED")).split("|")[1])
+    for reader, writer, framer in clients[1:]:
+        writer.write(protocol.join_room(room_id).encode())
+        await read_until(reader, framer, "JOIN")
+    admin_writer.write(protocol.start_game().encode())
+    for reader, writer, framer in clients:
+        await read_until(reader, framer, "START")
+    return clients
+
+
+async def spam_updates(writer, counter, deadline):
+    i = 0
+    while time.perf_counter() < deadline:
+        i += 1
+        writer.write(protocol.update_position(round((i % 900000) / 1000000, 6)).encode())
+        counter.updates += 1
+        await writer.drain()
+        await asyncio.sleep(0)
+
+
+async def run(host, port, rooms, duration):
+    counter = Counter()
+    all_clients = []
+    for room_index in range(rooms):
+        all_clients.extend(await open_room(host, port, room_index))
+
+    readers = [asyncio.create_task(count_positions(r, f, counter)) for r, _, f in all_clients]
+    counter.measuring = True
+    start = time.perf_counter()
+    await asyncio.gather(*(spam_updates(w, counter, start + duration) for _, w, _ in all_clients))
+    elapsed = time.perf_counter() - start
+    counter.measuring = False
+
+    for task in readers:
+        task.cancel()
+    for _, writer, _ in all_clients:
+        writer.close()
+    return counter.updates / elapsed, counter.positions / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="external server port (default: in-process serwer.py)")
+    parser.add_argument("--rooms", type=int, default=25)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    embedded = None
+    port = args.port
+    if port is None:
+        embedded = serwer.start_in_thread(args.host, 0)
+        port = embedded.port
+    try:
+        updates, positions = asyncio.run(run(args.host, port, args.rooms, args.duration))
+    finally:
+        if embedded is not None:
+            embedded.stop()
+    target = "serwer.py (in-process)" if embedded else f"{args.host}:{port}"
+    print(f"{target}: {updates:,.0f} UPDATE/s sent, {positions:,.0f} POS/s delivered "
+          f"({args.rooms} rooms x {MAX_PLAYERS_PER_ROOM} players)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Latency from an inbound POS| line to the widget, and to the repaint that shows it.
+
+Compares the threaded transport (reader thread + queued pyqtSignal) with the
+Qt event loop transport (QTcpSocket). A local socket plays the server and
+streams POS| updates for a single car. The time each line was written is
+compared with the updateCarPosition call that delivers it and with the
+paintEvent that first draws the car there. Easing is switched off while
+measuring, so every animation tick moves the car straight to its target and
+the paint latency is not the animation lag. Cars repaint on the 16 ms
+animation clock, so updates superseded before the next tick are never
+painted and only about a third of them get a paint time.
+
+Run from the repository root:
+
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_transport.py
+"""
+import os
+import sys
+import time
+import socket
+import statistics
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+import klient
+
+UPDATES = 200
+INTERVAL = 0.005
+
+
+def serve(listener, sent_at, ready):
+    conn, _ = listener.accept()
+    ready.wait()
+    for i in range(UPDATES):
+        position = (i + 1) / (UPDATES + 1)
+        sent_at[i] = time.perf_counter()
+        conn.sendall(f"POS| {position:.6f}|alice\n".encode())
+        time.sleep(INTERVAL)
+    time.sleep(0.2)
+    conn.close()
+
+
+def measure(app, transport):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    port = listener.getsockname()[1]
+
+    sent_at = [None] * UPDATES
+    delivered_at = [None] * UPDATES
+    painted_at = [None] * UPDATES
+    ready = threading.Event()
+    server = threading.Thread(target=serve, args=(listener, sent_at, ready), daemon=True)
+    server.start()
+
+    client = klient.Client(transport)
+    client.login_dialog.hide()
+    client.player_id = "alice"
+    client.initUI()
+    client.bg_widget.setBackground(1)
+    client.bg_widget.addCar("alice", 1)
+    client.bg_widget.ANIMATION_TIME_CONSTANT = 1e-9
+    client.show()
+
+    def stamp(times, position, now):
+        index = round(position * (UPDATES + 1)) - 1
+        if 0 <= index < UPDATES and times[index] is None and sent_at[index] is not None:
+            times[index] = now
+
+    original_update = client.bg_widget.updateCarPosition
+    original_paint = client.bg_widget.paintEvent
+
+    def timed_update(nickname, position):
+        stamp(delivered_at, position, time.perf_counter())
+        original_update(nickname, position)
+
+    def timed_paint(event):
+        original_paint(event)
+        stamp(painted_at, client.bg_widget.cars["alice"][1], time.perf_counter())
+
+    client.bg_widget.updateCarPosition = timed_update
+    client.bg_widget.paintEvent = timed_paint
+
+    client.network.connect("127.0.0.1", port)
+    client.startReceiving()
+    ready.set()
+
+    deadline = time.perf_counter() + UPDATES * INTERVAL + 1.0
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.0002)
+
+    client.network.connected = False
+    client.close()
+    listener.close()
+
+    def latencies(times):
+        return [(t - s) * 1000 for s, t in zip(sent_at, times) if s is not None and t is not None]
+    return latencies(delivered_at), latencies(painted_at)
+
+
+def report(label, latencies):
+    if not latencies:
+        return f"{label} none measured"
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return (f"{label} {len(latencies)}/{UPDATES}, median {statistics.median(latencies):.2f} ms, "
+            f"p95 {p95:.2f} ms, max {latencies[-1]:.2f} ms")
+
+
+def main():
+    app = QApplication(sys.argv)
+    for transport in ("thread", "qt"):
+        delivered, painted = measure(app, transport)
+        print(f"{transport:>6}: {report('delivered', delivered)}")
+        print(f"{'':>6}  {report('painted  ', painted)}")
+
+
+if __name__ == '__main__':
+    main()
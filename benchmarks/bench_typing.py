@@ -0,0 +1,101 @@
+"""Keystroke-to-feedback latency: stylesheet per key vs. TypingEngine + palette.
+
+Each keystroke sets the input text (which fires textChanged) and repaints the
+input synchronously, so the measured time includes restyling and drawing.
+"before" is the previous handler: startswith() plus setStyleSheet() on every
+key. "after" is Client.on_text_changed.
+
+Run from the repository root:
+
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/bench_typing.py
+"""
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication, QLineEdit
+from PyQt5.QtGui import QFont
+
+import klient
+
+WORD = "extraordinarily"
+ROUNDS = 200
+
+
+def keystrokes():
+    # Type the word with one typo that is corrected, like a real player would.
+    texts = []
+    for i in range(1, 6):
+        texts.append(WORD[:i])
+    texts.append(WORD[:5] + "x")
+    texts.append(WORD[:5])
+    for i in range(6, len(WORD) + 1):
+        texts.append(WORD[:i])
+    return texts
+
+
+def measure(line_edit, reset):
+    samples = []
+    texts = keystrokes()
+    for _ in range(ROUNDS):
+        reset()
+        for text in texts:
+            start = time.perf_counter()
+            line_edit.setText(text)
+            line_edit.repaint()
+            samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def legacy_input():
+    line_edit = QLineEdit()
+    line_edit.setFont(QFont("Arial", 24))
+    line_edit.show()
+
+    def on_text_changed():
+        text = line_edit.text()
+        if WORD.startswith(text):
+            line_edit.setStyleSheet("color: green")
+        else:
+            line_edit.setStyleSheet("color: red")
+
+    line_edit.textChanged.connect(on_text_changed)
+    return line_edit, lambda: line_edit.setText("")
+
+
+def engine_input():
+    client = klient.Client()
+    client.login_dialog.hide()
+    client.initUI()
+    client.show()
+    client.current_word = WORD
+
+    def reset():
+        client.typing.reset(WORD)
+        client.text_input.blockSignals(True)
+        client.text_input.setText("")
+        client.text_input.blockSignals(False)
+
+    return client.text_input, reset
+
+
+def report(name, samples):
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:>6}: median {statistics.median(samples):.1f} us, p95 {p95:.1f} us, mean {statistics.mean(samples):.1f} us")
+
+
+def main():
+    _app = QApplication(sys.argv)
+    line_edit, reset = legacy_input()
+    report("before", measure(line_edit, reset))
+    line_edit, reset = engine_input()
+    report("after", measure(line_edit, reset))
+
+
+if __name__ == '__main__':
+    main()
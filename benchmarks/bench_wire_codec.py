@@ -0,0 +1,145 @@
+"""Text POS| lines vs. binary position frames (wire_codec).
+
+Measures, for rooms of 2 and 4 players:
+  encode   building one broadcast: the POS| line as serwer.py writes it vs.
+           wire_codec.encode_positions
+  decode   framing and parsing a burst of broadcasts read in 4 KB chunks:
+           LineFramer plus the split()/float() parsing in updatePositions vs.
+           WireFramer, which hands out decoded (slot, progress) pairs
+  bytes    POS traffic one race puts on the wire. Every player sends an
+           UPDATE| per word and each one is answered with a broadcast to the
+           room, as serwer.cpp does.
+
+Run from the repository root:
+
+    python3 benchmarks/bench_wire_codec.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire_codec
+from protocol import LineFramer
+from wire_codec import WireFramer
+
+NICKNAMES = ["alice_k", "bartek99", "carol", "dawid_m"]
+BROADCASTS = 50000
+CHUNK = 4096
+
+
+def text_broadcast(players):
+    msg = "POS|"
+    for nickname, position in players:
+        msg += f" {position:.6f}|{nickname}"
+    return (msg + "\n").encode()
+
+
+def binary_broadcast(players):
+    return wire_codec.encode_positions((slot, position) for slot, (_, position) in enumerate(players))
+
+
+def parse_text(message):
+    # The parsing half of Client.updatePositions.
+    positions = []
+    data = message.replace("POS|", "").strip()
+    for pair in [p.strip() for p in data.split() if p.strip()]:
+        pos_str, nickname = pair.split('|')
+        positions.append((nickname, float(pos_str)))
+    return positions
+
+
+def random_rooms(count, players, seed=1):
+    rng = random.Random(seed)
+    return [[(nickname, round(rng.random(), 6)) for nickname in NICKNAMES[:players]] for _ in range(count)]
+
+
+def rate(fn, items):
+    start = time.perf_counter()
+    fn(items)
+    return len(items) / (time.perf_counter() - start)
+
+
+def encode_all(encode):
+    def run(rooms):
+        for players in rooms:
+            encode(players)
+    return run
+
+
+def chunks(data):
+    return [data[i:i + CHUNK] for i in range(0, len(data), CHUNK)]
+
+
+def decode_text(stream):
+    framer = LineFramer()
+    decoded = 0
+    for chunk in stream:
+        for message in framer.feed(chunk):
+            decoded += len(parse_text(message))
+    return decoded
+
+
+def decode_binary(stream):
+    framer = WireFramer()
+    decoded = 0
+    for chunk in stream:
+        for frame in framer.feed(chunk):
+            decoded += len(frame)
+    return decoded
+
+
+def race_bytes(players, words):
+    rng = random.Random(players)
+    progress = {nickname: 0 for nickname in NICKNAMES[:players]}
+    text_total = binary_total = 0
+    for _ in range(words * players):
+        nickname = rng.choice([n for n, done in progress.items() if done < words] or list(progress))
+        progress[nickname] = min(words, progress[nickname] + 1)
+        room = [(n, round(done / words, 6)) for n, done in progress.items()]
+        text_total += len(text_broadcast(room)) * players
+        binary_total += len(binary_broadcast(room)) * players
+    return text_total, binary_total
+
+
+def average_words():
+    counts = []
+    for name in os.listdir("resources/text"):
+        with open(os.path.join("resources/text", name), encoding="utf-8") as f:
+            counts.append(len(f.read().replace("$", " ").split()))
+    return round(sum(counts) / len(counts))
+
+
+def main():
+    words = average_words()
+    for players in (2, 4):
+        rooms = random_rooms(BROADCASTS, players)
+        text_stream = chunks(b"".join(text_broadcast(room) for room in rooms))
+        binary_stream = chunks(b"".join(binary_broadcast(room) for room in rooms))
+
+        text_encode = rate(encode_all(text_broadcast), rooms)
+        binary_encode = rate(encode_all(binary_broadcast), rooms)
+        start = time.perf_counter()
+        assert decode_text(text_stream) == BROADCASTS * players
+        text_decode = BROADCASTS / (time.perf_counter() - start)
+        start = time.perf_counter()
+        assert decode_binary(binary_stream) == BROADCASTS * players
+        binary_decode = BROADCASTS / (time.perf_counter() - start)
+        text_race, binary_race = race_bytes(players, words)
+
+        print(f"{players} players")
+        print(f"  encode  text {text_encode:>12,.0f}/s   binary {binary_encode:>12,.0f}/s   "
+              f"({binary_encode / text_encode:.1f}x)")
+        print(f"  decode  text {text_decode:>12,.0f}/s   binary {binary_decode:>12,.0f}/s   "
+              f"({binary_decode / text_decode:.1f}x)")
+        print(f"  bytes   text {len(text_broadcast(rooms[0])):>12} B    binary {len(binary_broadcast(rooms[0])):>12} B    "
+              f"per broadcast")
+        print(f"  race    text {text_race:>12,} B    binary {binary_race:>12,} B    "
+              f"({words} words, {text_race / binary_race:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
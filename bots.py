@@ -0,0 +1,272 @@
+"""Headless bot swarm for load testing a TypeRacer server.
+
+Every bot is an asyncio task with its own connection. Bots log in, fill
+rooms of MAX_PLAYERS_PER_ROOM (the first bot of a room creates it and starts
+the race once the room is full), type the race text at a WPM drawn from a
+normal distribution and send UPDATE| after every word, like klient.py does.
+
+Latencies are collected in log-bucketed histograms:
+  create   CREATE| -> CREATED|
+  join     JOIN|   -> JOIN|
+  start    admin's START| -> START| at each bot
+  pos      UPDATE| -> first POS| carrying that position for the bot
+  end      room's last UPDATE|1.0 -> END| at each bot
+
+Usage:
+    python3 bots.py --host 127.0.0.1 --bots 400 --wpm-mean 70 --wpm-sd 20
+"""
+import sys
+import time
+import math
+import random
+import asyncio
+import argparse
+
+import protocol
+from protocol import LineFramer, MAX_PLAYERS_PER_ROOM
+
+
+def read_port_from_config(default=12437):
+    try:
+        with open("resources/config.conf", "r") as f:
+            for line in f:
+                parts = line.strip().split()
+                if len(parts) == 2 and parts[0] == "port":
+                    return int(parts[1])
+    except (FileNotFoundError, ValueError):
+        pass
+    return default
+
+
+class LatencyHistogram:
+    """HDR-style histogram: each power-of-two range of microseconds is split
+    into SUB_BUCKETS linear buckets, so every recorded value keeps about
+    two significant digits regardless of magnitude."""
+    SUB_BUCKETS = 64
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.max_us = 0
+
+    def bucket(self, us):
+        if us < self.SUB_BUCKETS:
+            return 0, us
+        exponent = us.bit_length() - self.SUB_BUCKETS.bit_length()
+        return exponent + 1, us >> exponent
+
+    def bucket_value(self, exponent, sub):
+        if exponent == 0:
+            return sub
+        return ((sub + 1) << (exponent - 1)) - 1
+
+    def record(self, seconds):
+        us = max(0, int(seconds * 1e6))
+        key = self.bucket(us)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.total += 1
+        self.max_us = max(self.max_us, us)
+
+    def percentile(self, p):
+        if not self.total:
+            return 0
+        target = math.ceil(self.total * p / 100.0)
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= target:
+                return min(self.bucket_value(*key), self.max_us)
+        return self.max_us
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "p50_ms": self.percentile(50) / 1000,
+            "p90_ms": self.percentile(90) / 1000,
+            "p99_ms": self.percentile(99) / 1000,
+            "p99.9_ms": self.percentile(99.9) / 1000,
+            "max_ms": self.max_us / 1000,
+        }
+
+
+class Stats:
+    def __init__(self):
+        self.histograms = {name: LatencyHistogram() for name in ("create", "join", "start", "pos", "end")}
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.races = 0
+
+    def report(self, elapsed):
+        print(f"[BOTS] {self.races} races, {self.sent} messages sent, {self.received} received, "
+              f"{self.errors} errors in {elapsed:.1f}s")
+        print(f"{'':>8} {'count':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'p99.9':>9} {'max':>9}  (ms)")
+        for name, histogram in self.histograms.items():
+            s = histogram.summary()
+            print(f"{name:>8} {s['count']:>8} {s['p50_ms']:>9.2f} {s['p90_ms']:>9.2f} "
+                  f"{s['p99_ms']:>9.2f} {s['p99.9_ms']:>9.2f} {s['max_ms']:>9.2f}")
+
+
+class RoomState:
+    def __init__(self, size):
+        self.size = size
+        self.room_id = asyncio.get_running_loop().create_future()
+        self.start_sent_at = 0.0
+        self.last_finish_sent_at = 0.0
+
+
+class Bot:
+    def __init__(self, nickname, room, is_admin, wpm, stats, races):
+        self.nickname = nickname
+        self.room = room
+        self.is_admin = is_admin
+        self.wpm = wpm
+        self.stats = stats
+        self.races = races
+        self.framer = LineFramer()
+        self.inbox = asyncio.Queue()
+        self.pending_positions = {}
+
+    def send(self, message):
+        self.writer.write(message.encode())
+        self.stats.sent += 1
+
+    async def read_loop(self):
+        while True:
+            data = await self.reader.read(65536)
+            if not data:
+                await self.inbox.put(("CLOSED", ""))
+                return
+            now = time.perf_counter()
+            for msg in self.framer.feed(data):
+                self.stats.received += 1
+                cmd, payload = protocol.split_message(msg)
+                if cmd == "POS":
+                    self.match_positions(payload, now)
+                elif cmd is not None:
+                    await self.inbox.put((cmd, payload))
+
+    def match_positions(self, payload, now):
+        if not self.pending_positions:
+            return
+        for pair in payload.split():
+            position, _, nickname = pair.partition('|')
+            if nickname == self.nickname:
+                sent_at = self.pending_positions.pop(position, None)
+                if sent_at is not None:
+                    self.stats.histograms["pos"].record(now - sent_at)
+
+    async def expect(self, *commands):
+        while True:
+            cmd, payload = await self.inbox.get()
+            if cmd in commands:
+                return cmd, payload
+            if cmd == "CLOSED":
+                raise ConnectionError("connection closed by server")
+            if cmd == "ERROR":
+                raise RuntimeError(payload)
+
+    async def run(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        reader_task = asyncio.create_task(self.read_loop())
+        try:
+            self.send(protocol.login(self.nickname))
+            await self.expect("ROOMS")
+            await self.enter_room()
+            for _ in range(self.races):
+                await self.race()
+            self.send(protocol.leave_room(self.nickname, self.room.room_id.result()))
+            await self.writer.drain()
+        except (ConnectionError, RuntimeError) as e:
+            self.stats.errors += 1
+            print(f"[BOTS] {self.nickname}: {e}")
+        finally:
+            reader_task.cancel()
+            self.writer.close()
+
+    async def enter_room(self):
+        if self.is_admin:
+            sent_at = time.perf_counter()
+            self.send(protocol.create_room())
+            _, payload = await self.expect("CREATED")
+            self.stats.histograms["create"].record(time.perf_counter() - sent_at)
+            self.room.room_id.set_result(int(payload))
+            await self.wait_for_full_room()
+        else:
+            room_id = await self.room.room_id
+            sent_at = time.perf_counter()
+            self.send(protocol.join_room(room_id))
+            await self.expect("JOIN")
+            self.stats.histograms["join"].record(time.perf_counter() - sent_at)
+
+    async def wait_for_full_room(self):
+        while True:
+            _, payload = await self.expect("ROOM")
+            players = [p for p in payload.split("|")[1:] if p.strip()]
+            if len(players) >= self.room.size:
+                return
+
+    async def race(self):
+        if self.is_admin:
+            self.room.start_sent_at = time.perf_counter()
+            self.send(protocol.start_game())
+        _, text = await self.expect("TEXT")
+        await self.expect("START")
+        self.stats.histograms["start"].record(time.perf_counter() - self.room.start_sent_at)
+
+        words = text.replace("$", " ").split()
+        seconds_per_char = 12.0 / self.wpm
+        for i, word in enumerate(words, 1):
+            await asyncio.sleep((len(word) + 1) * seconds_per_char)
+            progress = round(i / len(words), 6)
+            sent_at = time.perf_counter()
+            self.pending_positions[f"{progress:.6f}"] = sent_at
+            self.send(protocol.update_position(progress))
+            if progress >= 1.0:
+                self.room.last_finish_sent_at = max(self.room.last_finish_sent_at, sent_at)
+
+        await self.expect("END")
+        self.stats.histograms["end"].record(time.perf_counter() - self.room.last_finish_sent_at)
+        self.pending_positions.clear()
+        if self.is_admin:
+            self.stats.races += 1
+
+
+async def swarm(args):
+    stats = Stats()
+    rng = random.Random(args.seed)
+    tasks = []
+    room = None
+    started = time.perf_counter()
+    for i in range(args.bots):
+        slot = i % MAX_PLAYERS_PER_ROOM
+        if slot == 0:
+            room = RoomState(min(MAX_PLAYERS_PER_ROOM, args.bots - i))
+        wpm = max(args.wpm_min, rng.gauss(args.wpm_mean, args.wpm_sd))
+        bot = Bot(f"{args.prefix}{i:05d}", room, slot == 0, wpm, stats, args.races)
+        tasks.append(asyncio.create_task(bot.run(args.host, args.port)))
+        if args.ramp > 0:
+            await asyncio.sleep(1.0 / args.ramp)
+    await asyncio.gather(*tasks)
+    stats.report(time.perf_counter() - started)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TypeRacer bot swarm load generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=read_port_from_config())
+    parser.add_argument("--bots", type=int, default=40)
+    parser.add_argument("--races", type=int, default=1, help="races per room")
+    parser.add_argument("--wpm-mean", type=float, default=70.0)
+    parser.add_argument("--wpm-sd", type=float, default=20.0)
+    parser.add_argument("--wpm-min", type=float, default=15.0)
+    parser.add_argument("--ramp", type=float, default=200.0, help="bots connected per second (0 = all at once)")
+    parser.add_argument("--prefix", default="bot")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    asyncio.run(swarm(args))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
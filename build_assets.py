@@ -0,0 +1,367 @@
+"""Build the race backgrounds loaded by the client.
+
+assets/bg1.svg..bg4.svg are one scenery drawing cropped to one
+to four lanes, and every lane strip in it is a copy of the first one moved
+down by a fixed pitch. This script checks that and writes:
+
+  base.svgz         the scenery without any lane strip
+  lanes<N>.svgz     overlay drawn on top of base: one lane strip plus N-1 <use>s of it
+  backgrounds.json  per lane count: view box height, lane offsets, car height ratio
+
+Editor metadata, ids nothing references, unused gradients and CSS rules and
+indentation are stripped, and groups that are translated copies of an
+earlier sibling are replaced by <use>.
+
+The sources stay in assets/, outside the resources/ the client ships with.
+
+    python3 build_assets.py [--source assets] [--out resources/background]
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import argparse
+import xml.etree.ElementTree as ET
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+SVG = f"{{{SVG_NS}}}"
+HREF = f"{{{XLINK_NS}}}href"
+
+# Where a car sits inside a lane strip, and how tall it is, as fractions of
+# the strip's height. Tuned by eye against the original hand-written layout.
+LANE_CENTER = 0.61
+CAR_HEIGHT = 0.55
+
+SOURCE_PATTERN = re.compile(r"bg(\d+)\.svg$")
+PATH_TOKEN = re.compile(r"[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+REFERENCE = re.compile(r"url\(#([^)]+)\)")
+CSS_RULE = re.compile(r"\.([\w-]+)\s*\{([^}]*)\}")
+TOLERANCE = 0.05
+
+
+def view_box(root):
+    return [float(v) for v in root.get("viewBox").replace(",", " ").split()]
+
+
+def path_numbers(d, dx=0.0, dy=0.0):
+    """Commands and coordinates of a path, absolute coordinates moved by (dx, dy)."""
+    commands = []
+    numbers = []
+    cmd = None
+    index = 0
+    for token in PATH_TOKEN.findall(d):
+        if token.isalpha():
+            cmd = token
+            index = 0
+            commands.append(token)
+            continue
+        value = float(token)
+        at_start = cmd == "m" and len(numbers) < 2
+        if cmd in "MLCSQT" or at_start:
+            value += dx if index % 2 == 0 else dy
+        elif cmd == "H":
+            value += dx
+        elif cmd == "V":
+            value += dy
+        elif cmd == "A" and index % 7 in (5, 6):
+            value += dx if index % 7 == 5 else dy
+        numbers.append(value)
+        index += 1
+    return "".join(commands), numbers
+
+
+def first_point(element):
+    for path in element.iter(f"{SVG}path"):
+        _, numbers = path_numbers(path.get("d", ""))
+        if len(numbers) >= 2:
+            return numbers[0], numbers[1]
+    return None
+
+
+def is_translated_copy(original, copy, dx, dy):
+    if original.tag != copy.tag or len(original) != len(copy):
+        return False
+    keys = set(original.attrib) - {"id"}
+    if keys != set(copy.attrib) - {"id"}:
+        return False
+    for key in keys:
+        if key == "d":
+            commands, numbers = path_numbers(original.get("d"), dx, dy)
+            copy_commands, copy_numbers = path_numbers(copy.get("d"))
+            if commands != copy_commands or len(numbers) != len(copy_numbers):
+                return False
+            if any(abs(a - b) > TOLERANCE for a, b in zip(numbers, copy_numbers)):
+                return False
+        elif original.get(key) != copy.get(key):
+            return False
+    return all(is_translated_copy(a, b, dx, dy) for a, b in zip(original, copy))
+
+
+def offset_between(original, copy):
+    a, b = first_point(original), first_point(copy)
+    if a is None or b is None:
+        return None
+    return round(b[0] - a[0], 1), round(b[1] - a[1], 1)
+
+
+def content_group(root):
+    """Innermost group reached by following single-group chains from the root."""
+    group = root
+    while True:
+        children = [child for child in group if child.tag == f"{SVG}g"]
+        if len(children) != 1:
+            return group
+        group = children[0]
+
+
+def find_lane_strips(root):
+    """The trailing groups of the drawing that are vertical copies of one another."""
+    group = content_group(root)
+    children = [child for child in group if child.tag == f"{SVG}g"]
+    strips = [children[-1]]
+    for candidate in reversed(children[:-1]):
+        offset = offset_between(candidate, strips[0])
+        if offset is None or offset[0] != 0 or offset[1] <= 0:
+            break
+        if not is_translated_copy(candidate, strips[0], 0, offset[1]):
+            break
+        strips.insert(0, candidate)
+    if len(strips) < 2:
+        raise SystemExit("[ASSETS] Could not find repeated lane strips in the drawing")
+    if list(group)[-len(strips):] != strips:
+        raise SystemExit("[ASSETS] Lane strips are not drawn last, overlays would change the stacking order")
+    pitches = {offset_between(strips[0], strip)[1] / i for i, strip in enumerate(strips[1:], 1)}
+    if max(pitches) - min(pitches) > TOLERANCE:
+        raise SystemExit(f"[ASSETS] Lane strips are not evenly spaced: {sorted(pitches)}")
+    return group, strips, offset_between(strips[0], strips[1])[1]
+
+
+def dedupe_copies(element, ids=None):
+    """Replace child groups that are translated copies of an earlier sibling by <use>."""
+    ids = set() if ids is None else ids
+    groups = []
+    for index, child in enumerate(list(element)):
+        if child.tag != f"{SVG}g":
+            continue
+        for original in groups:
+            offset = offset_between(original, child)
+            if offset is not None and is_translated_copy(original, child, *offset):
+                if original.get("id") is None:
+                    original.set("id", f"u{len(ids)}")
+                    ids.add(original.get("id"))
+                use = ET.Element(f"{SVG}use", {HREF: "#" + original.get("id"),
+                                                "transform": f"translate({offset[0]:g},{offset[1]:g})"})
+                element.remove(child)
+                element.insert(index, use)
+                break
+        else:
+            groups.append(child)
+            dedupe_copies(child, ids)
+
+
+def references(root):
+    found = set()
+    for element in root.iter():
+        for key, value in element.attrib.items():
+            found.update(REFERENCE.findall(value))
+            if key == HREF and value.startswith("#"):
+                found.add(value[1:])
+        if element.tag == f"{SVG}style" and element.text:
+            found.update(REFERENCE.findall(element.text))
+    return found
+
+
+def strip_editor_data(root):
+    for parent in root.iter():
+        for child in list(parent):
+            if not child.tag.startswith(SVG) or child.tag in (f"{SVG}title", f"{SVG}desc", f"{SVG}metadata"):
+                parent.remove(child)
+        for key in list(parent.attrib):
+            if key.startswith("{") and key != HREF:
+                del parent.attrib[key]
+
+
+def prune_styles(root):
+    used = set()
+    for element in root.iter():
+        used.update(element.get("class", "").split())
+    for style in root.iter(f"{SVG}style"):
+        rules = [f".{name}{{{' '.join(body.split())}}}" for name, body in CSS_RULE.findall(style.text or "")
+                 if name in used]
+        style.text = "".join(rules).replace("; ", ";").replace(": ", ":")
+
+
+def prune_ids(root):
+    while True:
+        used = references(root)
+        removed = False
+        for parent in root.iter():
+            for child in list(parent):
+                if parent.tag == f"{SVG}defs" and child.get("id") not in used:
+                    parent.remove(child)
+                    removed = True
+        if not removed:
+            break
+    for element in root.iter():
+        if "id" in element.attrib and element.get("id") not in used:
+            del element.attrib["id"]
+    for parent in root.iter():
+        for child in list(parent):
+            if child.tag == f"{SVG}defs" and len(child) == 0:
+                parent.remove(child)
+
+
+def flatten_groups(element):
+    index = 0
+    while index < len(element):
+        child = element[index]
+        flatten_groups(child)
+        if child.tag == f"{SVG}g" and not child.attrib:
+            element.remove(child)
+            for offset, grandchild in enumerate(list(child)):
+                element.insert(index + offset, grandchild)
+            index += len(child)
+        else:
+            index += 1
+
+
+def strip_whitespace(root):
+    for element in root.iter():
+        if element.tag != f"{SVG}style":
+            element.text = None
+        element.tail = None
+
+
+def minify(root):
+    strip_editor_data(root)
+    prune_styles(root)
+    prune_ids(root)
+    dedupe_copies(root)
+    flatten_groups(root)
+    strip_whitespace(root)
+    return root
+
+
+def new_document(template, width, height):
+    root = ET.Element(f"{SVG}svg", {"version": template.get("version", "1.2"),
+                                    "viewBox": f"0 0 {width:g} {height:g}",
+                                    "width": f"{width:g}", "height": f"{height:g}"})
+    for child in template:
+        if child.tag in (f"{SVG}defs", f"{SVG}style"):
+            root.append(child)
+    return root
+
+
+def write_svgz(path, root):
+    data = ET.tostring(root, encoding="utf-8")
+    with open(path, "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    return len(data), os.path.getsize(path)
+
+
+def strip_bounds(strip):
+    """Vertical extent of a lane strip, from the rectangles its paths start with."""
+    from PyQt5.QtCore import QByteArray
+    from PyQt5.QtSvg import QSvgRenderer
+    root = ET.Element(f"{SVG}svg", {"viewBox": "0 0 10000 10000"})
+    copy = ET.fromstring(ET.tostring(strip))
+    copy.set("id", "strip")
+    root.append(copy)
+    bounds = QSvgRenderer(QByteArray(ET.tostring(root))).boundsOnElement("strip")
+    return bounds.top(), bounds.height()
+
+
+def load_sources(directory):
+    sources = {}
+    for name in os.listdir(directory):
+        match = SOURCE_PATTERN.match(name)
+        if match:
+            sources[int(match.group(1))] = ET.parse(os.path.join(directory, name)).getroot()
+    if not sources:
+        raise SystemExit(f"[ASSETS] No bg<N>.svg files in {directory}")
+    return dict(sorted(sources.items()))
+
+
+def same_scenery(a, b):
+    """True if two drawings only differ in their root attributes (the crop) and rounding."""
+    a_tokens = PATH_TOKEN.findall("".join(ET.tostring(child, encoding="unicode") for child in a))
+    b_tokens = PATH_TOKEN.findall("".join(ET.tostring(child, encoding="unicode") for child in b))
+    if len(a_tokens) != len(b_tokens):
+        return False
+    for x, y in zip(a_tokens, b_tokens):
+        if x != y and (x.isalpha() or y.isalpha() or abs(float(x) - float(y)) > TOLERANCE):
+            return False
+    return True
+
+
+def build(source_dir, out_dir):
+    sources = load_sources(source_dir)
+    lane_counts = list(sources)
+    full = sources[lane_counts[-1]]
+    width = view_box(full)[2]
+
+    reference = minify(ET.fromstring(ET.tostring(full)))
+    for lanes, root in sources.items():
+        if not same_scenery(reference, minify(ET.fromstring(ET.tostring(root)))):
+            raise SystemExit(f"[ASSETS] bg{lanes}.svg is not a crop of bg{lane_counts[-1]}.svg")
+
+    group, strips, pitch = find_lane_strips(full)
+    strip_top, strip_height = strip_bounds(strips[0])
+    for strip in strips:
+        group.remove(strip)
+
+    template = strips[0]
+    template.attrib.clear()
+    template.set("id", "lane")
+
+    os.makedirs(out_dir, exist_ok=True)
+    sizes = {}
+    base = minify(ET.fromstring(ET.tostring(full)))
+    sizes["base.svgz"] = write_svgz(os.path.join(out_dir, "base.svgz"), base)
+
+    variants = []
+    for lanes, root in sources.items():
+        height = view_box(root)[3]
+        overlay = new_document(ET.fromstring(ET.tostring(full)), width, height)
+        overlay.append(ET.fromstring(ET.tostring(template)))
+        for k in range(1, lanes):
+            overlay.append(ET.Element(f"{SVG}use", {HREF: "#lane", "transform": f"translate(0,{k * pitch:g})"}))
+        name = f"lanes{lanes}.svgz"
+        sizes[name] = write_svgz(os.path.join(out_dir, name), minify(overlay))
+        centers = [strip_top + LANE_CENTER * strip_height + k * pitch for k in range(lanes)]
+        variants.append({
+            "lanes": lanes,
+            "height": height,
+            "overlay": name,
+            "lane_offsets": [round(center / height, 4) for center in centers],
+            "car_height_ratio": round(CAR_HEIGHT * strip_height / height, 4),
+        })
+
+    metadata = {"width": width, "base": "base.svgz", "lane_pitch": pitch, "variants": variants}
+    with open(os.path.join(out_dir, "backgrounds.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+        f.write("\n")
+
+    source_bytes = sum(os.path.getsize(os.path.join(source_dir, f"bg{n}.svg")) for n in sources)
+    for name, (raw, packed) in sizes.items():
+        print(f"[ASSETS] {name}: {raw:,} bytes minified, {packed:,} gzipped")
+    print(f"[ASSETS] {len(sources)} backgrounds: {source_bytes:,} bytes of SVG -> "
+          f"{sum(packed for _, packed in sizes.values()):,} bytes shipped")
+    return metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the race background assets")
+    parser.add_argument("--source", default="assets")
+    parser.add_argument("--out", default="resources/background")
+    args = parser.parse_args(argv)
+    build(args.source, args.out)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
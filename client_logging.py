@@ -0,0 +1,119 @@
+"""Leveled, non-blocking logging for the client.
+
+Each subsystem logs through its own logger under "typeracer" (client,
+network, render, config). Log calls only put the record on a queue. A
+QueueListener thread does all formatting and writing, so nothing on the GUI
+thread waits on a terminal or a redirected file. Messages take %-style
+arguments and are only merged into text when a record is written. Hot
+paths log at DEBUG, and at the default INFO level the logger drops those
+calls before a record is even created.
+
+The most recent records are also kept in a ring buffer. dump_recent()
+writes them out, and it runs automatically before the traceback of an
+uncaught exception.
+"""
+import sys
+import queue
+import atexit
+import logging
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+ROOT = "typeracer"
+
+listener = None
+ring = None
+
+
+class SubsystemFormatter(logging.Formatter):
+    """Formats records as "[NETWORK] message", the way the client always printed."""
+    def __init__(self):
+        super().__init__("[%(subsystem)s] %(message)s")
+
+    def format(self, record):
+        record.subsystem = record.name.rsplit(".", 1)[-1].upper()
+        return super().format(record)
+
+
+class LazyQueueHandler(QueueHandler):
+    """Enqueues records untouched, leaving all formatting to the listener thread."""
+    def prepare(self, record):
+        return record
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last capacity records, unformatted, for dump()."""
+    def __init__(self, capacity):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def dump(self, stream):
+        for record in list(self.records):
+            stream.write(self.format(record) + "\n")
+        stream.flush()
+
+
+def parse_level(name, default=logging.INFO):
+    return LEVELS.get(str(name).lower(), default)
+
+
+def setup_logging(level="info", stream=None, ring_size=1000):
+    """Route every "typeracer" logger through a background writer thread."""
+    global listener, ring
+    first_setup = ring is None
+    stop_logging()
+
+    formatter = SubsystemFormatter()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+    ring = RingBufferHandler(ring_size)
+    ring.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    logger = logging.getLogger(ROOT)
+    logger.handlers = [LazyQueueHandler(records)]
+    logger.setLevel(parse_level(level) if isinstance(level, str) else level)
+    logger.propagate = False
+
+    listener = QueueListener(records, output, ring)
+    listener.start()
+    if first_setup:
+        atexit.register(stop_logging)
+        install_excepthook()
+    return logger
+
+
+def stop_logging():
+    """Write out everything still queued and stop the writer thread."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+def dump_recent(stream=None):
+    stream = stream or sys.stderr
+    if ring is None:
+        return
+    stream.write(f"---- last {len(ring.records)} log records ----\n")
+    ring.dump(stream)
+
+
+def install_excepthook():
+    previous = sys.excepthook
+
+    def excepthook(exc_type, exc, tb):
+        dump_recent()
+        previous(exc_type, exc, tb)
+
+    sys.excepthook = excepthook
@@ -0,0 +1,304 @@
+"""Stall detection and opt-in profiling for the client.
+
+StallWatchdog notices when the Qt main thread stops running its event
+loop. A QTimer on the main thread records a heartbeat, and a daemon thread
+checks how old the last heartbeat is. When it is older than the threshold,
+the daemon thread takes the main thread's stack from sys._current_frames()
+and logs it. It samples again once per threshold for as long as the stall
+lasts, so a long freeze shows where the time went, not only where it began.
+
+HookProfiler wraps chosen methods (paintEvent, on_text_changed,
+dispatchMessage) with cProfile and/or tracemalloc. Only the code that runs
+inside those methods is measured. The results go to a directory on disk
+at a fixed interval and once more at exit.
+
+RollingSamples and RateMeter are the always-on counters behind the
+client's performance HUD. Recording one costs a deque append or an
+integer increment.
+"""
+import os
+import sys
+import time
+import pstats
+import inspect
+import atexit
+import logging
+import cProfile
+import threading
+import traceback
+import tracemalloc
+from functools import wraps
+from collections import deque
+
+from PyQt5.QtCore import QTimer
+
+watchdog_log = logging.getLogger("typeracer.watchdog")
+profile_log = logging.getLogger("typeracer.profile")
+
+PROFILE_MODES = ("cpu", "mem")
+
+
+class RollingSamples:
+    """The last size measurements of something, e.g. paint times in ms."""
+    def __init__(self, size=120):
+        self.values = deque(maxlen=size)
+
+    def add(self, value):
+        self.values.append(value)
+
+    def clear(self):
+        self.values.clear()
+
+    def summary(self):
+        """(last, mean, p95, max) over the window, or None if it is empty."""
+        values = list(self.values)
+        if not values:
+            return None
+        ordered = sorted(values)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return values[-1], sum(values) / len(values), p95, ordered[-1]
+
+
+class RateMeter:
+    """Per-second rate of an ever-increasing counter, over the last window_s seconds.
+
+    The hot path only increments a plain integer; sample() is called from a
+    slow timer with the counter's current value.
+    """
+    def __init__(self, window_s=2.0):
+        self.window_s = window_s
+        self.samples = deque()
+
+    def sample(self, count, now=None):
+        now = time.monotonic() if now is None else now
+        self.samples.append((now, count))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= self.window_s:
+            self.samples.popleft()
+
+    def rate(self):
+        if len(self.samples) < 2:
+            return 0.0
+        (start, first), (end, last) = self.samples[0], self.samples[-1]
+        return (last - first) / (end - start) if end > start else 0.0
+
+
+class StallWatchdog:
+    def __init__(self, threshold_ms=250, parent=None):
+        self.threshold = threshold_ms / 1000
+        self.main_ident = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stalls = 0
+        self.longest_ms = 0.0
+        self.running = False
+        self.heartbeat = QTimer(parent)
+        self.heartbeat.setInterval(max(10, int(threshold_ms / 4)))
+        self.heartbeat.timeout.connect(self.beat)
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.last_beat = time.monotonic()
+        self.heartbeat.start()
+        self.thread = threading.Thread(target=self.monitor, name="stall-watchdog", daemon=True)
+        self.thread.start()
+        watchdog_log.info("Watching the main thread for stalls over %d ms", self.threshold * 1000)
+
+    def stop(self):
+        self.running = False
+        self.heartbeat.stop()
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+
+    def mainStack(self):
+        frame = sys._current_frames().get(self.main_ident)
+        if frame is None:
+            return ""
+        return "".join(traceback.format_stack(frame))
+
+    def monitor(self):
+        stall_started = None
+        next_sample = None
+        last_stack = None
+        samples = 0
+        while self.running:
+            time.sleep(self.heartbeat.interval() / 1000)
+            beat = self.last_beat
+            now = time.monotonic()
+            if now - beat < self.threshold:
+                if stall_started is not None:
+                    self.finishStall((beat - stall_started) * 1000, samples)
+                    stall_started = None
+                continue
+            if stall_started is None or beat > stall_started:
+                stall_started = beat
+                next_sample = now
+                last_stack = None
+                samples = 0
+            if now >= next_sample:
+                stack = self.mainStack()
+                samples += 1
+                if stack != last_stack:
+                    watchdog_log.warning("Main thread unresponsive for %d ms, stack:\n%s",
+                                         (now - stall_started) * 1000, stack)
+                else:
+                    watchdog_log.warning("Main thread unresponsive for %d ms, same stack",
+                                         (now - stall_started) * 1000)
+                last_stack = stack
+                next_sample = now + self.threshold
+
+    def finishStall(self, duration_ms, samples):
+        self.stalls += 1
+        self.longest_ms = max(self.longest_ms, duration_ms)
+        watchdog_log.warning("Main thread stalled for %d ms (%d stack samples)", duration_ms, samples)
+
+    def stats(self):
+        return {"stalls": self.stalls, "longest_ms": round(self.longest_ms, 1)}
+
+
+class HookStats:
+    __slots__ = ("calls", "total_s", "max_s", "allocated")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.allocated = 0
+
+
+class HookProfiler:
+    """cProfile/tracemalloc around instrumented methods, dumped to directory every interval_ms."""
+    def __init__(self, modes, directory="profiles", interval_ms=30000, frames=10):
+        self.cpu = "cpu" in modes
+        self.mem = "mem" in modes
+        self.directory = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}")
+        self.interval_ms = interval_ms
+        self.frames = frames
+        self.profile = cProfile.Profile() if self.cpu else None
+        # cProfile measures one thread at a time. A call that finds another
+        # thread inside a hook still counts in hooks.txt but is not profiled.
+        self.lock = threading.RLock()
+        self.local = threading.local()
+        self.hooks = {}
+        self.snapshot = None
+        self.dumps = 0
+        self.stopped = threading.Event()
+
+    def instrument(self, cls, name):
+        """Replace cls.name with a wrapper; call before any instance of cls exists."""
+        method = getattr(cls, name)
+        label = f"{cls.__name__}.{name}"
+        stats = self.hooks.setdefault(label, HookStats())
+        # PyQt drops signal arguments a slot does not take, but only when it
+        # can see the slot's own signature, so the wrapper has to drop them.
+        code = method.__code__
+        max_args = None if code.co_flags & inspect.CO_VARARGS else code.co_argcount
+
+        @wraps(method)
+        def hooked(*args, **kwargs):
+            return self.call(stats, method, args[:max_args], kwargs)
+
+        setattr(cls, name, hooked)
+
+    def call(self, stats, method, args, kwargs):
+        depth = getattr(self.local, "depth", 0)
+        profiling = self.cpu and (depth > 0 or self.lock.acquire(blocking=False))
+        self.local.depth = depth + 1
+        allocated = tracemalloc.get_traced_memory()[0] if self.mem else 0
+        started = time.perf_counter()
+        if profiling and depth == 0:
+            self.profile.enable()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            if profiling and depth == 0:
+                self.profile.disable()
+            elapsed = time.perf_counter() - started
+            self.local.depth = depth
+            if profiling and depth == 0:
+                self.lock.release()
+            stats.calls += 1
+            stats.total_s += elapsed
+            stats.max_s = max(stats.max_s, elapsed)
+            if self.mem:
+                stats.allocated += tracemalloc.get_traced_memory()[0] - allocated
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.mem and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        # Dumps run on their own thread: summarizing a tracemalloc snapshot
+        # takes long enough to show up as a stall on the main thread.
+        threading.Thread(target=self.dumpLoop, name="profile-dump", daemon=True).start()
+        atexit.register(self.stop)
+        profile_log.info("Profiling %s into %s every %g s", ", ".join(self.hooks),
+                         self.directory, self.interval_ms / 1000)
+
+    def dumpLoop(self):
+        while not self.stopped.wait(self.interval_ms / 1000):
+            self.dump()
+
+    def stop(self):
+        if not self.stopped.is_set():
+            self.stopped.set()
+            self.dump()
+
+    def dump(self):
+        with self.lock:
+            self.dumps += 1
+            try:
+                self.writeHooks()
+                if self.cpu:
+                    self.writeCpu()
+                if self.mem:
+                    self.writeMemory()
+            except OSError as e:
+                profile_log.warning("Could not write profile: %s", e)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "w") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+
+    def writeHooks(self):
+        lines = [f"{'hook':<32} {'calls':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'alloc KB':>9}"]
+        for label, stats in self.hooks.items():
+            mean = stats.total_s / stats.calls if stats.calls else 0.0
+            lines.append(f"{label:<32} {stats.calls:>8} {stats.total_s * 1000:>10.1f} {mean * 1000:>9.3f} "
+                         f"{stats.max_s * 1000:>9.2f} {stats.allocated / 1024:>9.1f}")
+        self.write("hooks.txt", "\n".join(lines) + "\n")
+
+    def writeCpu(self):
+        self.profile.create_stats()
+        if not self.profile.stats:
+            return
+        stats = pstats.Stats(self.profile)
+        stats.dump_stats(os.path.join(self.directory, "cpu.prof"))
+        with open(os.path.join(self.directory, "cpu.txt"), "w") as f:
+            stats.stream = f
+            stats.sort_stats("cumulative").print_stats(40)
+
+    def writeMemory(self):
+        snapshot = tracemalloc.take_snapshot()
+        if self.snapshot is None:
+            title = "top allocations"
+            top = snapshot.statistics("lineno")
+        else:
+            title = f"allocation changes since dump {self.dumps - 1}"
+            top = snapshot.compare_to(self.snapshot, "lineno")
+        self.snapshot = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced {current / 1024:.1f} KB, peak {peak / 1024:.1f} KB", title]
+        lines.extend(str(stat) for stat in top[:25])
+        self.write(f"memory-{self.dumps:03d}.txt", "\n".join(lines) + "\n")
+
+
+def parse_profile_modes(value):
+    modes = {mode.strip() for mode in (value or "").lower().split(",") if mode.strip()}
+    unknown = modes.difference(PROFILE_MODES)
+    if unknown:
+        profile_log.warning("Unknown profile mode(s): %s", ", ".join(sorted(unknown)))
+    return modes.intersection(PROFILE_MODES)
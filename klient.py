@@ -1,14 +1,34 @@
 import os
+import json
+import re
 import sys
+import math
 import socket
 import time
 import random
+import logging
 import threading
 from queue import Queue
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit, QListWidgetItem, QVBoxLayout, QWidget, QLabel, QLineEdit, QPushButton, QListWidget, QMessageBox, QHBoxLayout
-from PyQt5.QtSvg import QSvgWidget, QSvgRenderer
-from PyQt5.QtCore import Qt, QTimer, QRectF, QSize, pyqtSignal, QObject, QMetaObject, pyqtSlot, Q_ARG
-from PyQt5.QtGui import QPainter, QTextCursor, QTextCharFormat, QColor, QFont
+from collections import OrderedDict, deque
+import protocol
+from client_logging import setup_logging
+from diagnostics import HookProfiler, RateMeter, RollingSamples, StallWatchdog, parse_profile_modes
+from raster_cache import RasterCache
+from traffic_log import TrafficCapture
+from wire_codec import CAPABILITY, PositionFrame, WireFramer, quantize_progress
+from race_log import KeystrokeRecorder, RaceLog, find_race_log, race_log_path, text_checksum, KEY_BACKSPACE, KEY_ENTER
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit, QVBoxLayout, QWidget, QLabel, QLineEdit, QPushButton, QListView, QMessageBox, QHBoxLayout
+from PyQt5.QtSvg import QSvgRenderer
+from PyQt5.QtCore import Qt, QTimer, QRectF, QSize, pyqtSignal, QObject, QMetaObject, pyqtSlot, Q_ARG, QAbstractListModel, QModelIndex
+from PyQt5 import sip
+from PyQt5.QtNetwork import QAbstractSocket, QTcpSocket
+from PyQt5.QtGui import QPainter, QTextCursor, QTextCharFormat, QColor, QFont, QPixmap, QPalette, QImage
+
+
+log = logging.getLogger("typeracer.client")
+net_log = logging.getLogger("typeracer.network")
+render_log = logging.getLogger("typeracer.render")
+config_log = logging.getLogger("typeracer.config")
 
 
 def read_port_from_config():
@@ -19,16 +39,40 @@ def read_port_from_config():
                 if len(parts) == 2 and parts[0] == "port":
                     return int(parts[1])
     except FileNotFoundError:
-        print("[CONFIG] Config file not found")
+        config_log.warning("Config file not found")
         return
     except ValueError:
-        print("[CONFIG] Invalid port in config") 
+        config_log.warning("Invalid port in config")
         return
 
 
+def read_config_value(key, default=None, cast=int):
+    try:
+        with open("resources/config.conf", "r") as f:
+            for line in f:
+                parts = line.strip().split()
+                if len(parts) == 2 and parts[0] == key:
+                    return cast(parts[1])
+    except FileNotFoundError:
+        config_log.warning("Config file not found")
+    except ValueError:
+        config_log.warning("Invalid %s in config", key)
+    return default
+
+
 class NetworkClient:
-    def __init__(self):
+    """TCP connection to the server; send() enqueues and a writer thread drains the queue."""
+    def __init__(self, max_queue=256):
         self.connected = False
+        self.max_queue = max_queue
+        self.outbound = deque()
+        self.outbound_ready = threading.Condition()
+        self.writer_thread = None
+        self.queued_bytes = 0
+        self.sent_messages = 0
+        self.dropped_messages = 0
+        self.last_send_latency = 0.0
+        self.max_send_latency = 0.0
 
     def connect(self, ip, port):
         try:
@@ -38,16 +82,484 @@ class NetworkClient:
             self.socket.settimeout(5)
             self.socket.connect((ip, port))
             self.connected = True
+            self.writer_thread = threading.Thread(target=self.writeLoop, args=(self.socket,))
+            self.writer_thread.daemon = True
+            self.writer_thread.start()
             return True
         except Exception as e:
-            print(f"[NETWORK] Connection error: {e}")
+            net_log.error("Connection error: %s", e)
             self.connected = False
             self.socket.close()
             return False
 
+    def close(self):
+        with self.outbound_ready:
+            self.connected = False
+            self.outbound_ready.notify_all()
+        self.socket.shutdown(socket.SHUT_RDWR)
+        self.socket.close()
+
     def send(self, message):
-        if self.connected:
-            self.socket.send(message.encode())
+        if not message.endswith("\n"):
+            message += "\n"
+        if not self.connected:
+            return
+        data = message.encode()
+        with self.outbound_ready:
+            # Only position updates may be dropped; control messages always go out.
+            if message.startswith("UPDATE|"):
+                self.dropStaleUpdates()
+                if len(self.outbound) >= self.max_queue:
+                    self.dropped_messages += 1
+                    net_log.debug("Outbound queue full, dropping: %s", message.strip())
+                    return
+            self.outbound.append((time.perf_counter(), data))
+            self.queued_bytes += len(data)
+            self.outbound_ready.notify()
+
+    def dropStaleUpdates(self):
+        stale = [item for item in self.outbound if item[1].startswith(b"UPDATE|")]
+        for item in stale:
+            self.outbound.remove(item)
+            self.queued_bytes -= len(item[1])
+            self.dropped_messages += 1
+
+    def writeLoop(self, sock):
+        while True:
+            with self.outbound_ready:
+                while not self.outbound and self.connected and self.socket is sock:
+                    self.outbound_ready.wait(0.5)
+                if not self.connected or self.socket is not sock:
+                    return
+                queued_at, data = self.outbound.popleft()
+                self.queued_bytes -= len(data)
+            try:
+                sock.sendall(data)
+            except OSError as e:
+                net_log.error("Send error: %s", e)
+                self.connected = False
+                return
+            latency = time.perf_counter() - queued_at
+            self.last_send_latency = latency
+            self.max_send_latency = max(self.max_send_latency, latency)
+            self.sent_messages += 1
+
+    def stats(self):
+        return {
+            "queued_messages": len(self.outbound),
+            "queued_bytes": self.queued_bytes,
+            "sent_messages": self.sent_messages,
+            "dropped_messages": self.dropped_messages,
+            "last_send_latency": self.last_send_latency,
+            "max_send_latency": self.max_send_latency,
+        }
+
+class QtNetworkClient:
+    """Same interface as NetworkClient, driven by QTcpSocket on the GUI thread."""
+    def __init__(self):
+        self.connected = False
+        self.framer = WireFramer()
+        self.on_message = None
+        self.on_disconnected = None
+        self.received_any = False
+        self.sent_messages = 0
+        self.dropped_messages = 0
+        self.written_bytes = 0
+        self.enqueued_bytes = 0
+        self.pending_writes = deque()
+        self.last_send_latency = 0.0
+        self.max_send_latency = 0.0
+
+    def connect(self, ip, port):
+        self.socket = QTcpSocket()
+        self.socket.connectToHost(ip, port)
+        if not self.socket.waitForConnected(5000):
+            net_log.error("Connection error: %s", self.socket.errorString())
+            self.connected = False
+            self.socket.abort()
+            return False
+        self.socket.setSocketOption(QAbstractSocket.LowDelayOption, 1)
+        self.socket.readyRead.connect(self.readAvailable)
+        self.socket.bytesWritten.connect(self.trackWritten)
+        self.socket.disconnected.connect(self.handleDisconnected)
+        self.connected = True
+        return True
+
+    def startReading(self, on_message, on_disconnected):
+        self.on_message = on_message
+        self.on_disconnected = on_disconnected
+        if self.socket.bytesAvailable():
+            self.readAvailable()
+
+    def close(self):
+        self.connected = False
+        self.socket.abort()
+        # May run inside this socket's readyRead; let the event loop delete it.
+        sip.transferto(self.socket, None)
+        self.socket.deleteLater()
+
+    def send(self, message):
+        if not message.endswith("\n"):
+            message += "\n"
+        if not self.connected:
+            return
+        data = message.encode()
+        self.enqueued_bytes += len(data)
+        self.pending_writes.append((self.enqueued_bytes, time.perf_counter()))
+        self.socket.write(data)
+
+    def readAvailable(self):
+        data = bytes(self.socket.readAll())
+        if not data:
+            return
+        self.received_any = True
+        for msg in self.framer.feed(data):
+            if not self.connected:
+                break
+            if self.on_message is not None:
+                self.on_message(msg)
+
+    def trackWritten(self, count):
+        self.written_bytes += count
+        now = time.perf_counter()
+        while self.pending_writes and self.pending_writes[0][0] <= self.written_bytes:
+            _, queued_at = self.pending_writes.popleft()
+            latency = now - queued_at
+            self.last_send_latency = latency
+            self.max_send_latency = max(self.max_send_latency, latency)
+            self.sent_messages += 1
+
+    def handleDisconnected(self):
+        net_log.warning("Connection closed by server")
+        was_connected = self.connected
+        self.connected = False
+        if was_connected and self.on_disconnected is not None:
+            self.on_disconnected()
+
+    def stats(self):
+        return {
+            "queued_messages": len(self.pending_writes),
+            "queued_bytes": self.socket.bytesToWrite() if self.connected else 0,
+            "sent_messages": self.sent_messages,
+            "dropped_messages": self.dropped_messages,
+            "last_send_latency": self.last_send_latency,
+            "max_send_latency": self.max_send_latency,
+        }
+
+def create_network_client(transport):
+    if transport == "qt":
+        return QtNetworkClient()
+    return NetworkClient()
+
+class LobbySync:
+    """Debounces LIST| requests, skipping those a newer ROOMS| listing already answered."""
+    def __init__(self, send, window_ms=250):
+        self.send = send
+        self.requested_at = 0.0
+        self.last_listing_at = 0.0
+        self.requests = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.skipped_fresh = 0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(window_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def requestRefresh(self, *args):
+        self.requests += 1
+        if self.timer.isActive():
+            self.coalesced += 1
+            return
+        self.requested_at = time.monotonic()
+        self.timer.start()
+
+    def listingReceived(self):
+        self.last_listing_at = time.monotonic()
+
+    def flush(self):
+        if self.last_listing_at and self.last_listing_at >= self.requested_at:
+            self.skipped_fresh += 1
+            return
+        self.send(protocol.list_rooms())
+        self.sent += 1
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "skipped_fresh": self.skipped_fresh,
+            "suppressed": self.coalesced + self.skipped_fresh,
+        }
+
+class RaceText:
+    """Race text indexed once when TEXT| arrives, for O(1) progress lookups."""
+    def __init__(self, text):
+        self.lines = [line.strip() for line in text.split("$") if line.split()]
+        self.line_words = [line.split() for line in self.lines]
+        self.words = []
+        self.line_starts = []
+        self.char_starts = []
+        chars = 0
+        for words in self.line_words:
+            self.line_starts.append(len(self.words))
+            for word in words:
+                self.words.append(word)
+                self.char_starts.append(chars)
+                chars += len(word) + 1
+        self.line_starts.append(len(self.words))
+        self.total_words = len(self.words)
+        self.total_chars = max(0, chars - 1)
+        self.checksum = text_checksum("$".join(self.lines))
+
+    def line(self, line_index):
+        if 0 <= line_index < len(self.lines):
+            return self.lines[line_index]
+        return ""
+
+    def word_index(self, line_index, word_in_line):
+        return self.line_starts[line_index] + word_in_line
+
+    def chars_completed(self, word_index):
+        if word_index >= self.total_words:
+            return self.total_chars
+        return self.char_starts[word_index]
+
+    def word_progress(self, word_index):
+        if not self.total_words:
+            return 1.0
+        return min(1.0, word_index / self.total_words)
+
+    def char_progress(self, word_index, typed_chars=0):
+        if not self.total_chars:
+            return 1.0
+        return min(1.0, (self.chars_completed(word_index) + typed_chars) / self.total_chars)
+
+class TypingEngine:
+    """Incremental match state for the word being typed."""
+    def __init__(self, word=""):
+        self.reset(word)
+
+    def reset(self, word):
+        self.word = word
+        self.typed = ""
+        self.matched = 0
+        self.correct = True
+        self.started = False
+        self.clean = True
+
+    def update(self, text):
+        previous = self.typed
+        if text.startswith(previous):
+            if self.matched == len(previous):
+                limit = min(len(text), len(self.word))
+                while self.matched < limit and text[self.matched] == self.word[self.matched]:
+                    self.matched += 1
+        elif previous.startswith(text):
+            self.matched = min(self.matched, len(text))
+        else:
+            self.matched = 0
+            limit = min(len(text), len(self.word))
+            while self.matched < limit and text[self.matched] == self.word[self.matched]:
+                self.matched += 1
+        self.typed = text
+
+        if text:
+            self.started = True
+        correct = self.matched == len(text)
+        if not correct:
+            self.clean = False
+
+        flipped = correct != self.correct
+        self.correct = correct
+        return flipped
+
+    def finishWord(self):
+        return 1 if self.clean else 0
+
+class GhostRacer:
+    """Replays a recorded race log as a ghost car."""
+    def __init__(self, log, on_progress):
+        self.log = log
+        self.on_progress = on_progress
+        self.index = 0
+        self.start_ns = 0
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.step)
+
+    def start(self, start_ns=None):
+        self.index = 0
+        self.start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        self.scheduleNext()
+
+    def scheduleNext(self):
+        if self.index >= len(self.log):
+            return
+        due_ns = self.start_ns + self.log.first_key_ns + self.log.times[self.index]
+        self.timer.start(max(0, (due_ns - time.perf_counter_ns()) // 1000000))
+
+    def step(self):
+        elapsed_ns = time.perf_counter_ns() - self.start_ns - self.log.first_key_ns
+        times, keys, words, correct = self.log.times, self.log.keys, self.log.words, self.log.correct
+        count = len(self.log)
+        progress = None
+        while self.index < count and times[self.index] <= elapsed_ns:
+            key = keys[self.index]
+            if correct[self.index] and (key == 32 or key == KEY_ENTER):
+                progress = min(1.0, (words[self.index] + 1) / self.log.total_words)
+            self.index += 1
+        if progress is not None:
+            self.on_progress(progress)
+        self.scheduleNext()
+
+    def stop(self):
+        self.timer.stop()
+        self.log.close()
+
+class PositionPublisher:
+    """Rate-limits UPDATE| messages, sending only the latest progress."""
+    def __init__(self, send, max_rate=10):
+        self.send = send
+        self.interval = 1.0 / max_rate
+        self.pending = None
+        self.last_sent = None
+        self.last_sent_at = 0.0
+        self.sent_count = 0
+        self.coalesced_count = 0
+        self.in_flight = deque(maxlen=32)
+        self.fixed_point = False
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def publish(self, progress):
+        if self.pending is not None:
+            self.coalesced_count += 1
+        self.pending = progress
+
+        elapsed = time.monotonic() - self.last_sent_at
+        if progress >= 1.0 or elapsed >= self.interval:
+            self.flush()
+        elif not self.timer.isActive():
+            self.timer.start(max(1, int((self.interval - elapsed) * 1000)))
+
+    def flush(self):
+        self.timer.stop()
+        if self.pending is None:
+            return
+        progress, self.pending = self.pending, None
+        if progress == self.last_sent:
+            return
+        self.send(protocol.update_position(progress))
+        self.last_sent = progress
+        self.last_sent_at = time.monotonic()
+        self.in_flight.append((self.echoKey(progress), self.last_sent_at))
+        self.sent_count += 1
+
+    def echoKey(self, progress):
+        """progress as the server will echo it: 6 decimals in POS|, uint16 in binary frames."""
+        return quantize_progress(progress) if self.fixed_point else round(progress, 6)
+
+    def acknowledge(self, position):
+        """Seconds since the UPDATE| that a POS| showing our position echoes, or None."""
+        position = self.echoKey(position)
+        for i, (progress, sent_at) in enumerate(self.in_flight):
+            if progress == position:
+                for _ in range(i + 1):
+                    self.in_flight.popleft()
+                return time.monotonic() - sent_at
+        return None
+
+    def reset(self):
+        self.timer.stop()
+        self.pending = None
+        self.last_sent = None
+        self.last_sent_at = 0.0
+        self.in_flight.clear()
+
+ROOM_ENTRY_PATTERN = re.compile(r'\s*Room\s*(\d+)\s*:\s*(\d+)\s*(?:\[([^\]]*)\])?')
+
+
+def parse_room_entry(room_info):
+    """Parse 'Room<id>: <count> [<nick>, ...]' into (room_id, count, players, in_progress)."""
+    match = ROOM_ENTRY_PATTERN.match(room_info)
+    if match is None:
+        return None
+    names = match.group(3)
+    players = tuple(p.strip() for p in names.split(",")) if names else ()
+    in_progress = "gamestarted" in room_info.lower()
+    return int(match.group(1)), int(match.group(2)), players, in_progress
+
+
+class RoomListModel(QAbstractListModel):
+    """Rooms from the latest ROOMS| listing, diffed in so the view keeps its selection."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.room_ids = []
+        self.rooms = {}
+        self.player_id = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.room_ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        room_id = self.room_ids[index.row()]
+        count, players, in_progress = self.rooms[room_id]
+        display_str = f"Room {room_id}: {count} {'[In Progress]' if in_progress else ''}"
+        if players:
+            names = ", ".join(f"[You] {p}" if p == self.player_id else p for p in players)
+            display_str += f" [{names}]"
+        return display_str
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and self.rooms[self.room_ids[index.row()]][2]:
+            flags &= ~Qt.ItemIsEnabled
+        return flags
+
+    def roomId(self, row):
+        if 0 <= row < len(self.room_ids):
+            return self.room_ids[row]
+        return None
+
+    def applyListing(self, rooms_data):
+        listing = {}
+        for room_info in rooms_data.split("|")[1:]:
+            if not room_info.strip():
+                continue
+            entry = parse_room_entry(room_info)
+            if entry is None:
+                log.warning("Error parsing room info '%s'", room_info)
+                continue
+            listing[entry[0]] = entry[1:]
+
+        for row in range(len(self.room_ids) - 1, -1, -1):
+            if self.room_ids[row] not in listing:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.rooms[self.room_ids[row]]
+                del self.room_ids[row]
+                self.endRemoveRows()
+
+        row = 0
+        for room_id in sorted(listing):
+            while row < len(self.room_ids) and self.room_ids[row] < room_id:
+                row += 1
+            if row < len(self.room_ids) and self.room_ids[row] == room_id:
+                if self.rooms[room_id] != listing[room_id]:
+                    self.rooms[room_id] = listing[room_id]
+                    index = self.index(row)
+                    self.dataChanged.emit(index, index)
+            else:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.room_ids.insert(row, room_id)
+                self.rooms[room_id] = listing[room_id]
+                self.endInsertRows()
+            row += 1
 
 class LoginDialog(QWidget):
     def __init__(self, parent=None):
@@ -68,8 +580,119 @@ class LoginDialog(QWidget):
 
         self.connect_btn.setFocus()
 
+class PerfHud(QLabel):
+    """Small live readout of frame time, message rates, queues and UPDATE|->POS| delay."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFont(QFont("Monospace", 9))
+        self.setStyleSheet("QLabel { color: gray; }")
+        self.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+    @staticmethod
+    def formatMs(summary):
+        if summary is None:
+            return "-"
+        last, mean, p95, worst = summary
+        return f"{mean:.1f} avg {p95:.1f} p95 {worst:.1f} max ms"
+
+    def showStats(self, paint, rtt, in_rate, out_rate, network, stalls=None):
+        lines = [
+            f"paint {self.formatMs(paint)}",
+            f"RTT   {self.formatMs(rtt)}",
+            f"msgs  in {in_rate:.0f}/s  out {out_rate:.0f}/s",
+            f"queue {network['queued_messages']} msgs {network['queued_bytes']} B, "
+            f"dropped {network['dropped_messages']}",
+        ]
+        if stalls is not None:
+            lines.append(f"stalls {stalls['stalls']}, longest {stalls['longest_ms']:.0f} ms")
+        self.setText("\n".join(lines))
+
+
+class RaceView(QWidget):
+    """The race screen. Built once and reset() for every race."""
+    BACKGROUND_MIN_SIZE = QSize(1000, 500)
+    MARGIN = 20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+
+        self.bg_widget = BackgroundWidget(1)
+        self.bg_widget.setMinimumSize(self.BACKGROUND_MIN_SIZE)
+        layout.addWidget(self.bg_widget)
+
+        self.current_line_label = QLabel()
+        self.current_line_label.setAlignment(Qt.AlignCenter)
+        self.current_line_label.setWordWrap(True)
+        self.current_line_label.setFont(QFont("Arial", 18))
+        self.current_line_label.setStyleSheet("QLabel { padding: 10px; }")
+        layout.addWidget(self.current_line_label)
+
+        self.next_line_label = QLabel()
+        self.next_line_label.setAlignment(Qt.AlignCenter)
+        self.next_line_label.setWordWrap(True)
+        self.next_line_label.setFont(QFont("Arial", 18))
+        self.next_line_label.setStyleSheet("QLabel { padding: 10px; color: gray; }")
+        layout.addWidget(self.next_line_label)
+
+        self.word_label = QLabel()
+        self.word_label.setAlignment(Qt.AlignCenter)
+        self.word_label.setFont(QFont("Arial", 24, QFont.Bold))
+        layout.addWidget(self.word_label)
+
+        self.text_input = QLineEdit()
+        self.text_input.setFixedHeight(50)
+        self.text_input.setFixedWidth(400)
+        self.text_input.setFont(QFont("Arial", 24))
+        self.text_input.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.text_input, 0, Qt.AlignCenter)
+
+        self.speed_label = QLabel('WPM: 0, Time: 0s')
+        self.speed_label.setFont(QFont("Arial", 24))
+
+        self.perf_hud = PerfHud()
+        self.perf_hud.hide()
+
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addWidget(self.speed_label, alignment=Qt.AlignLeft)
+        bottom_layout.addStretch()
+        bottom_layout.addWidget(self.perf_hud, alignment=Qt.AlignRight)
+        layout.addLayout(bottom_layout)
+
+        self.restart_button = QPushButton("Play Again")
+        self.restart_button.setFixedSize(200, 50)
+        self.restart_button.setFont(QFont("Arial", 16))
+        self.restart_button.hide()
+        layout.addWidget(self.restart_button, 0, Qt.AlignCenter)
+
+        layout.setSpacing(20)
+        layout.setContentsMargins(self.MARGIN, self.MARGIN, self.MARGIN, self.MARGIN)
+
+    def reset(self, race_text, players, background=None):
+        """Show a new race: race_text's first lines and one car per (nickname, car_number) in players."""
+        self.current_line_label.setText(race_text.line(0))
+        self.next_line_label.setText(race_text.line(1))
+        self.word_label.setText(race_text.line_words[0][0])
+        self.word_label.show()
+        self.text_input.blockSignals(True)
+        self.text_input.clear()
+        self.text_input.blockSignals(False)
+        self.text_input.show()
+        self.text_input.setEnabled(True)
+        self.speed_label.setText('WPM: 0, Time: 0s')
+        self.speed_label.show()
+        self.restart_button.hide()
+
+        self.bg_widget.clearCars()
+        self.bg_widget.setBackground(background or len(players))
+        for nickname, car_number in players:
+            log.info("Adding player: %s with car: %s", nickname, car_number)
+            self.bg_widget.addCar(nickname, car_number)
+
+
 class Client(QMainWindow):
     position_updated = pyqtSignal(str)
+    slot_positions_updated = pyqtSignal(object)
     game_started = pyqtSignal(str) 
     game_ended = pyqtSignal(str)
     room_updated = pyqtSignal(str)
@@ -79,38 +702,71 @@ class Client(QMainWindow):
     login_error_signal = pyqtSignal(str)
     left_room_signal = pyqtSignal()
     admin_status_updated = pyqtSignal()
+    room_joined = pyqtSignal(int)
+    server_error = pyqtSignal(str)
+
+    RACE_WINDOW_SIZE = QSize(1280, 720)
+    PERF_HUD_INTERVAL_MS = 500
     
-    def __init__(self):
+    def __init__(self, transport=None):
         super().__init__()
-        self.network = NetworkClient()
+        self.transport = transport or read_config_value("transport", "thread", str)
+        self.network = create_network_client(self.transport)
         self.player_id = None
         self.room_id = None
         self.is_admin = False
         self.game_finished = False
         self.server_thread = None
+        self.handlers = self.buildDispatchTable()
+        self.position_publisher = PositionPublisher(
+            lambda message: self.network.send(message),
+            read_config_value("position_rate", 10))
+        self.lobby_sync = LobbySync(
+            lambda message: self.network.send(message),
+            read_config_value("lobby_refresh_ms", 250))
         
-        self.text= ["Welcome to TypeRacer.$Enjoy!"] #do usuniecia
-        self.text_lines = self.text[0].split("$")
-        self.words_to_type = self.text_lines[0].split()
+        self.progress_mode = read_config_value("progress_mode", "words", str)
+        self.race_text = RaceText("Welcome to TypeRacer.$Enjoy!")
+        self.words_to_type = self.race_text.line_words[0]
         self.current_word = self.words_to_type[0]
         self.current_word_index = 0
         self.current_line_index = 0
         self.word_count = 0
         self.accuracy = 0
-        self.acc = 1
-        self.a = 0
+        self.typing = TypingEngine(self.current_word)
+        self.recorder = KeystrokeRecorder()
+        self.telemetry_dir = read_config_value("telemetry_dir", "races", str)
+        self.ghost_mode = read_config_value("ghost", "off", str)
+        self.ghost = None
         self.start_time = None
         self.game_finished = False
-        self.total_words = sum(len(line.split()) for line in self.text_lines)
+        self.received_messages = 0
+        self.rtt_samples = RollingSamples()
+        self.in_rate = RateMeter()
+        self.out_rate = RateMeter()
+        self.watchdog = None
+        self.capture = None
+        self.wire_format = read_config_value("wire_format", "text", str)
+        self.race_slots = ()
+        self.perf_hud_enabled = read_config_value("perf_hud", "off", str) == "on"
         
         self.position_updated.connect(self.updatePositions)
+        self.slot_positions_updated.connect(self.updateSlotPositions)
+        self.room_updated.connect(self.lobby_sync.requestRefresh)
+        self.room_updated.connect(self.prerenderForRoomState)
+        self.room_joined.connect(self.prerenderRaceAssets)
+        self.prerenderer = RaceAssetPrerenderer()
+        self.race_started_at = None
+        self.race_view = None
         self.game_started.connect(self.startRace)
         self.game_ended.connect(self.showRanking)
         self.room_list_updated.connect(self.updateRoomListItems)
         self.button_states_updated.connect(self.updateButtonStates)
         self.show_room_list_signal.connect(self.showRoomList)
-        self.login_error_signal.connect(self.handleLoginError)
+        # Queued: never reset the connection from inside the qt transport's readyRead.
+        self.login_error_signal.connect(self.handleLoginError, Qt.QueuedConnection)
         self.left_room_signal.connect(self.showLeftRoomMessage)
+        self.server_error.connect(self.showServerError, Qt.QueuedConnection)
         self.admin_status_updated.connect(self.handleAdminStatusUpdate)
 
         self.showLoginScreen()
@@ -118,85 +774,134 @@ class Client(QMainWindow):
 
     def initUI(self):
         self.setWindowTitle(f'TypeRacer Client {self.player_id}')
-        self.setGeometry(100, 100, 1280, 720)
-
-        main_widget = QWidget()
-        self.setCentralWidget(main_widget)
-        layout = QVBoxLayout(main_widget)
-
-        self.bg_widget = BackgroundWidget('resources/background/bg1.svg')
-        self.bg_widget.setMinimumSize(1000, 500)
-        layout.addWidget(self.bg_widget)
-
-        self.current_line_label = QLabel(self.text_lines[0])
-        self.current_line_label.setAlignment(Qt.AlignCenter)
-        self.current_line_label.setWordWrap(True)
-        self.current_line_label.setFont(QFont("Arial", 18))
-        self.current_line_label.setStyleSheet("QLabel { padding: 10px; }")
-        layout.addWidget(self.current_line_label)
+        self.setGeometry(100, 100, self.RACE_WINDOW_SIZE.width(), self.RACE_WINDOW_SIZE.height())
 
-        self.next_line_label = QLabel(self.text_lines[1])
-        self.next_line_label.setAlignment(Qt.AlignCenter)
-        self.next_line_label.setWordWrap(True)
-        self.next_line_label.setFont(QFont("Arial", 18))
-        self.next_line_label.setStyleSheet("QLabel { padding: 10px; color: gray; }")
-        layout.addWidget(self.next_line_label)
+        self.race_view = RaceView()
+        self.setCentralWidget(self.race_view)
 
-        self.word_label = QLabel(self.current_word)
-        self.word_label.setAlignment(Qt.AlignCenter)
-        self.word_label.setFont(QFont("Arial", 24, QFont.Bold))
-        layout.addWidget(self.word_label)
+        self.bg_widget = self.race_view.bg_widget
+        self.current_line_label = self.race_view.current_line_label
+        self.next_line_label = self.race_view.next_line_label
+        self.word_label = self.race_view.word_label
+        self.text_input = self.race_view.text_input
+        self.speed_label = self.race_view.speed_label
+        self.restart_button = self.race_view.restart_button
 
-        self.text_input = QLineEdit()
-        self.text_input.setFixedHeight(50)
-        self.text_input.setFixedWidth(400)
-        self.text_input.setFont(QFont("Arial", 24))
         self.text_input.textChanged.connect(self.on_text_changed)
-        self.text_input.setAlignment(Qt.AlignCenter)
-        layout.addWidget(self.text_input, 0, Qt.AlignCenter)
-
-        self.speed_label = QLabel('WPM: 0, Time: 0s')
-        self.speed_label.setFont(QFont("Arial", 24))
+        self.restart_button.clicked.connect(self.restart_game)
+        self.bg_widget.first_frame.connect(self.reportFirstFrame)
 
         self.current_wpm = 0
         self.elapsed_time = 0
 
-        self.time_timer = QTimer()
+        self.time_timer = QTimer(self)
         self.time_timer.timeout.connect(self.update_time_label)
-        self.time_timer.start(1000)
-        
-        bottom_layout = QHBoxLayout()
-        bottom_layout.addWidget(self.speed_label, alignment=Qt.AlignLeft)
-        bottom_layout.addStretch()
-        layout.addLayout(bottom_layout)
 
-        layout.setSpacing(20)
-        layout.setContentsMargins(20, 20, 20, 20)
+        self.perf_hud = self.race_view.perf_hud
+        self.perf_timer = QTimer(self)
+        self.perf_timer.setInterval(self.PERF_HUD_INTERVAL_MS)
+        self.perf_timer.timeout.connect(self.updatePerfHud)
+        self.setPerfHudVisible(self.perf_hud_enabled)
 
     def keyPressEvent(self, event):
+        if event.key() == Qt.Key_F3:
+            self.setPerfHudVisible(not self.perf_hud_enabled)
+            return
         if event.key() == Qt.Key_Escape:
             self.close()
         elif event.key() in (Qt.Key_Return, Qt.Key_Enter):
             text = self.text_input.text()
+            self.recordKey(KEY_ENTER, text == self.current_word)
             if text == self.current_word:
-                self.word_count += 1
-                if self.a == 0:
-                    self.acc = 1
-                else:
-                    self.acc = 0
-                self.accuracy += self.acc
-                self.a = 0
-                self.calculate_wpm()
-                self.next_word()
-                self.calculate_progress()
-                self.text_input.clear()
+                self.completeWord()
+
+    def setPerfHudVisible(self, visible):
+        self.perf_hud_enabled = visible
+        if self.race_view is None:
+            return
+        self.perf_hud.setVisible(visible)
+        if visible:
+            self.updatePerfHud()
+            self.perf_timer.start()
+        else:
+            self.perf_timer.stop()
+
+    def updatePerfHud(self):
+        network = self.network.stats()
+        self.in_rate.sample(self.received_messages)
+        self.out_rate.sample(network["sent_messages"])
+        self.perf_hud.showStats(
+            self.bg_widget.paint_times.summary(), self.rtt_samples.summary(),
+            self.in_rate.rate(), self.out_rate.rate(), network,
+            self.watchdog.stats() if self.watchdog is not None else None)
+
+    def currentWordIndex(self):
+        if self.current_line_index < len(self.race_text.lines):
+            return self.race_text.word_index(self.current_line_index, self.current_word_index)
+        return self.race_text.total_words
+
+    def recordKey(self, key, correct):
+        self.recorder.record(key, self.currentWordIndex(), correct)
+
+    def startGhost(self, car_number):
+        if self.ghost_mode not in ("self", "best") or self.telemetry_dir == "off":
+            return
+        path = find_race_log(self.telemetry_dir, self.race_text.checksum,
+                             self.player_id, best=self.ghost_mode == "best")
+        if path is None:
+            return
+        try:
+            ghost_log = RaceLog(path)
+        except (OSError, ValueError) as e:
+            log.warning("Could not open ghost log %s: %s", path, e)
+            return
+        self.bg_widget.addGhost(GHOST_NICKNAME, car_number, self.player_id)
+        self.ghost = GhostRacer(ghost_log, lambda progress: self.bg_widget.updateCarPosition(GHOST_NICKNAME, progress))
+        self.ghost.start(self.recorder.race_start_ns)
+        log.info("Racing against ghost from %s", path)
+
+    def stopGhost(self):
+        if self.ghost is not None:
+            self.ghost.stop()
+            self.ghost = None
+
+    def saveRaceLog(self):
+        if not len(self.recorder) or self.telemetry_dir == "off":
+            return
+        try:
+            path = race_log_path(self.telemetry_dir, self.player_id)
+            self.recorder.write(path, self.race_text.total_words, self.race_text.total_chars,
+                                self.race_text.checksum)
+            log.info("Race log saved to %s", path)
+        except OSError as e:
+            log.warning("Could not save race log: %s", e)
+
+    def completeWord(self):
+        self.word_count += 1
+        self.accuracy += self.typing.finishWord()
+        self.calculate_wpm()
+        self.next_word()
+        self.typing.reset(self.current_word)
+        if not self.game_finished:
+            self.calculate_progress()
+        self.text_input.clear()
+
+    def applyTypingFeedback(self, correct):
+        palette = self.text_input.palette()
+        palette.setColor(QPalette.Text, QColor("green") if correct else QColor("red"))
+        self.text_input.setPalette(palette)
 
     def calculate_progress(self):
-        total_words_before = sum(len(line.split()) for line in self.text_lines[:self.current_line_index])
-        words_completed = total_words_before + self.current_word_index
-        
-        progress = round(min(1.0, words_completed / self.total_words), 6)
-        print(f"[CLIENT] Calculated progress: {progress}")
+        if self.current_line_index < len(self.race_text.lines):
+            words_completed = self.race_text.word_index(self.current_line_index, self.current_word_index)
+        else:
+            words_completed = self.race_text.total_words
+
+        if self.progress_mode == "chars":
+            progress = round(self.race_text.char_progress(words_completed, self.typing.matched), 6)
+        else:
+            progress = round(self.race_text.word_progress(words_completed), 6)
+        log.debug("Calculated progress: %s", progress)
         
         if not self.game_finished:
             if hasattr(self, 'bg_widget'):
@@ -223,32 +928,30 @@ class Client(QMainWindow):
     def showLeftRoomMessage(self):
         QMessageBox.information(self, "Left Room", "You have successfully left the room.")
 
+    def showServerError(self, message):
+        QMessageBox.warning(self, "Error", message)
+
     def on_text_changed(self):
         text = self.text_input.text()
-        if self.a == 0:
-            self.acc = 1
-            self.a = 1
         if text.endswith(' '):
-            typed_word = text[:-1]
-            if typed_word == self.current_word:
-                self.word_count += 1
-                self.a = 0
-                self.accuracy += self.acc
-                self.calculate_wpm()
-                self.next_word()
-                if not self.game_finished:
-                    self.calculate_progress()
-                self.text_input.clear()
+            completed = text[:-1] == self.current_word
+            self.recordKey(ord(' '), completed)
+            if completed:
+                self.completeWord()
             return
 
         if self.start_time is None and len(text) > 0:
             self.start_time = time.time()
 
-        if self.current_word.startswith(text):
-            self.text_input.setStyleSheet("color: green")
-        else:
-            self.text_input.setStyleSheet("color: red")
-            self.acc = 0
+        previous = self.typing.typed
+        matched = self.typing.matched
+        if self.typing.update(text):
+            self.applyTypingFeedback(self.typing.correct)
+        if text != previous:
+            key = ord(text[-1]) if len(text) > len(previous) else KEY_BACKSPACE
+            self.recordKey(key, self.typing.correct)
+        if self.progress_mode == "chars" and self.typing.matched != matched:
+            self.calculate_progress()
 
     def next_word(self):
         if self.current_word_index + 1 >= len(self.words_to_type):
@@ -261,15 +964,11 @@ class Client(QMainWindow):
 
     def move_to_next_line(self):
         self.current_line_index += 1
-        if self.current_line_index < len(self.text_lines):
-            self.current_line_label.setText(self.text_lines[self.current_line_index])
-            
-            if self.current_line_index + 1 < len(self.text_lines):
-                self.next_line_label.setText(self.text_lines[self.current_line_index + 1])
-            else:
-                self.next_line_label.setText("")
+        if self.current_line_index < len(self.race_text.lines):
+            self.current_line_label.setText(self.race_text.line(self.current_line_index))
+            self.next_line_label.setText(self.race_text.line(self.current_line_index + 1))
                 
-            self.words_to_type = self.text_lines[self.current_line_index].split()
+            self.words_to_type = self.race_text.line_words[self.current_line_index]
             self.current_word_index = 0
             self.current_word = self.words_to_type[0]
             self.word_label.setText(self.current_word)
@@ -285,6 +984,7 @@ class Client(QMainWindow):
             
             self.calculate_progress()
             self.game_finished = True
+            self.saveRaceLog()
             
             self.current_line_label.setText("Game finished!")
             stats_text = (
@@ -296,11 +996,8 @@ class Client(QMainWindow):
             self.next_line_label.setText(stats_text)
 
     def restart_game(self):
-        if hasattr(self, 'restart_button'):
-            layout = self.centralWidget().layout()
-            layout.removeWidget(self.restart_button)
-            self.restart_button.deleteLater()
-        self.network.send("START|")
+        self.restart_button.hide()
+        self.network.send(protocol.start_game())
 
     def showLoginScreen(self):
         self.login_dialog = LoginDialog()
@@ -311,7 +1008,7 @@ class Client(QMainWindow):
         ip = self.login_dialog.ip_input.text().strip()
         nickname = self.login_dialog.nick_input.text().strip()
         
-        print(f"[CLIENT] Attempting to connect to {ip} with nickname '{nickname}'")
+        log.info("Attempting to connect to %s with nickname '%s'", ip, nickname)
         
         if not ip or not nickname:
             QMessageBox.warning(self, "Error", "Please enter both IP and nickname")
@@ -319,81 +1016,86 @@ class Client(QMainWindow):
 
         port = read_port_from_config()   
         if self.network.connect(ip, port):
-            print("[CLIENT] Connected to server")
+            log.info("Connected to server")
             self.player_id = nickname
-            self.network.send(f"LOGIN|{nickname}")
-            print(f"[CLIENT] Sent LOGIN|{nickname}")
+            if self.capture is not None:
+                self.capture.open(nickname)
+            capabilities = (CAPABILITY,) if self.wire_format == "binary" else ()
+            self.network.send(protocol.login(nickname, capabilities))
+            log.info("Sent LOGIN|%s", nickname)
             
-            if not self.server_thread or not self.server_thread.is_alive():
-                self.server_thread = threading.Thread(target=self.handleServerCommunication)
-                self.server_thread.daemon = True
-                self.server_thread.start()
-                print("[CLIENT] Started communication thread")
+            self.startReceiving()
             
             self.login_dialog.hide()
             return True
                 
-        print("[CLIENT] Could not connect to server")
+        log.error("Could not connect to server")
         QMessageBox.warning(self, "Error", "Could not connect to server")
         return False
             
-    def updateRoomListItems(self, rooms_data):
-        if hasattr(self, 'room_list'):
-            self.room_list.clear()
-            rooms = rooms_data.split("|")[1:]
-            for room_info in rooms:
-                room_info = room_info.strip()
-                if not room_info:
-                    continue
+    def startReceiving(self):
+        if self.transport == "qt":
+            self.network.startReading(self.receivedMessage, self.handleConnectionLost)
+            QTimer.singleShot(5000, self.checkLoginResponse)
+            log.info("Reading from the Qt event loop")
+            return
 
-                try:
-                    room_id_str, remainder = room_info.split(":", 1)
-                    room_id_str = room_id_str.strip().replace("Room", "")
-                    room_id = int(room_id_str)
-
-                    remainder = remainder.strip()
-                    parts = remainder.split(None, 1)
-                    if not parts:
-                        continue
-
-                    count = int(parts[0])
-                    names_str = ""
-                    if len(parts) > 1:
-                        names_str = parts[1]
-
-                    if names_str.startswith("[") and names_str.endswith("]"):
-                        player_list = [p.strip() for p in names_str[1:-1].split(",")]
-                        for i, p in enumerate(player_list):
-                            if p == self.player_id:
-                                player_list[i] = f"[You] {p}"
-                        names_str = "[" + ", ".join(player_list) + "]"
-
-                    game_in_progress = "[In Progress]" if "gameStarted" in room_info.lower() else ""
-                    display_str = f"Room {room_id}: {count} {game_in_progress}"
-                    if names_str:
-                        display_str += f" {names_str}"
-                    room_item = QListWidgetItem(display_str)
-                    if game_in_progress:
-                        room_item.setFlags(room_item.flags() & ~Qt.ItemIsEnabled)
-                    self.room_list.addItem(room_item)
+        if not self.server_thread or not self.server_thread.is_alive():
+            self.server_thread = threading.Thread(target=self.handleServerCommunication)
+            self.server_thread.daemon = True
+            self.server_thread.start()
+            log.info("Started communication thread")
 
-                except ValueError as e:
-                    print(f"[CLIENT] Error parsing room info '{room_info}': {e}")
+    def checkLoginResponse(self):
+        if self.network.connected and not self.network.received_any:
+            net_log.error("Connection timeout")
+            self.network.close()
+            self.login_error_signal.emit("Connection timed out. Please check the server IP and try again.")
+
+    def handleConnectionLost(self):
+        if not self.network.received_any:
+            self.login_error_signal.emit("An unexpected error occurred.")
 
+    def expectedBackgroundSize(self):
+        if hasattr(self, 'bg_widget') and self.bg_widget.isVisible():
+            return self.bg_widget.size()
+        min_size = RaceView.BACKGROUND_MIN_SIZE
+        width = max(min_size.width(), self.RACE_WINDOW_SIZE.width() - 2 * RaceView.MARGIN)
+        return QSize(width, min_size.height())
+
+    @pyqtSlot(int)
+    def prerenderRaceAssets(self, player_count):
+        self.prerenderer.request(max(1, player_count), self.expectedBackgroundSize(), self.devicePixelRatioF())
+
+    @pyqtSlot(str)
+    def prerenderForRoomState(self, payload):
+        if self.room_id is None:
+            return
+        players = [p for p in payload.split("|")[1:] if p.strip()]
+        self.prerenderRaceAssets(len(players))
+
+    def reportFirstFrame(self):
+        if self.race_started_at is None:
+            return
+        elapsed_ms = (time.perf_counter() - self.race_started_at) * 1000
+        self.race_started_at = None
+        render_log.info("Time to first race frame: %.1f ms (background cache %s, sprites %s)",
+                        elapsed_ms, self.bg_widget.cacheStats(), car_sprites.stats())
+
+    def updateRoomListItems(self, rooms_data):
+        self.lobby_sync.listingReceived()
+        if hasattr(self, 'room_list'):
+            self.room_model.player_id = self.player_id
+            self.room_model.applyListing(rooms_data)
             self.updateRoomList()
 
     def updateRoomList(self):
-        if hasattr(self, 'start_button'):
-            layout = self.room_window.layout()
-            layout.removeWidget(self.start_button)
-            self.start_button.deleteLater()
-            del self.start_button
-
-        if self.room_id is not None and self.is_admin:
-            layout = self.room_window.layout()
-            self.start_button = QPushButton("Start Game")
-            self.start_button.clicked.connect(self.startGame)
-            layout.addWidget(self.start_button)
+        if not hasattr(self, 'start_button'):
+            return
+        show_start = self.room_id is not None and self.is_admin
+        if show_start:
+            self.start_button.setEnabled(True)
+        self.start_button.setVisible(show_start)
 
     def showRoomList(self, rooms_data):
         if hasattr(self, 'room_window') and self.room_window.isVisible():
@@ -403,7 +1105,9 @@ class Client(QMainWindow):
         self.room_window.setWindowTitle("Game Rooms")
         layout = QVBoxLayout()
         
-        self.room_list = QListWidget()
+        self.room_model = RoomListModel(self.room_window)
+        self.room_list = QListView()
+        self.room_list.setModel(self.room_model)
         self.updateRoomListItems(rooms_data)
         
         button_layout = QHBoxLayout()
@@ -426,8 +1130,13 @@ class Client(QMainWindow):
         button_layout.addWidget(self.leave_btn)
         button_layout.addWidget(refresh_btn)
         
+        self.start_button = QPushButton("Start Game")
+        self.start_button.clicked.connect(self.startGame)
+        self.start_button.hide()
+
         layout.addWidget(self.room_list)
         layout.addLayout(button_layout)
+        layout.addWidget(self.start_button)
         
         self.room_window.setLayout(layout)
         self.room_window.show()
@@ -454,18 +1163,13 @@ class Client(QMainWindow):
             QMessageBox.warning(self, "Error", "You are not in any room!")
             return
         
-        self.network.send(f"LEAVE|{self.player_id}|{self.room_id}")
-        print(f"[CLIENT] Sent LEAVE request for room {self.room_id} by player {self.player_id}")
+        self.network.send(protocol.leave_room(self.player_id, self.room_id))
+        log.info("Sent LEAVE request for room %s by player %s", self.room_id, self.player_id)
         
         self.room_id = None
         self.is_admin = False
         
-        if hasattr(self, 'start_button'):
-            layout = self.room_window.layout()
-            layout.removeWidget(self.start_button)
-            self.start_button.deleteLater()
-            del self.start_button
-        
+        self.updateRoomList()
         self.updateButtonStates()
         
         self.refreshRooms()
@@ -473,75 +1177,82 @@ class Client(QMainWindow):
     def refreshRooms(self):
         if self.network.connected:
             self.updateRoomList()
-            self.network.send("LIST|\n")
+            self.lobby_sync.requestRefresh()
         else:
             QMessageBox.warning(self, "Error", "Not connected to the server.")
 
     def startGame(self):
-        self.network.send("START|")
+        self.network.send(protocol.start_game())
         self.start_button.setEnabled(False)
 
     @pyqtSlot(str)
     def startRace(self, data):
-        print("[CLIENT] Starting race with data:", data)
+        log.info("Starting race with data: %s", data)
+        self.race_started_at = time.perf_counter()
         try:
+            self.stopGhost()
             self.start_time = None
             self.word_count = 0
             self.accuracy = 0
-            self.acc = 1
-            self.a = 0
             self.current_line_index = 0
-            self.words_to_type = self.text_lines[0].split()
+            self.words_to_type = self.race_text.line_words[0]
             self.current_word_index = 0
             self.current_word = self.words_to_type[0]
+            self.typing.reset(self.current_word)
+            self.recorder.reset()
             self.game_finished = False
 
-            self.initUI()
-            
-            self.bg_widget.set_car_position(0)
-            self.sendPosition(0.0)
-
             parts = data.split()
             bg_num = int(parts[0])
-            print(f"[CLIENT] Background number: {bg_num}")
-                
-            bg_file = f'resources/background/bg{bg_num}.svg'
-            print(f"[CLIENT] Setting background: {bg_file}")
-            self.bg_widget.setBackground(bg_file)
-            
+            log.info("Background number: %s", bg_num)
+
+            players = []
             for player_data in parts[1:]:
                 if '|' not in player_data:
                     continue
-                    
                 car_num, nickname = player_data.split('|')
                 try:
-                    car_num = int(car_num)
-                    print(f"[CLIENT] Adding player: {nickname} with car: {car_num}")
-                    self.bg_widget.addCar(nickname, car_num)
-                    if nickname == self.player_id:
-                        self.bg_widget.player_id = nickname
+                    players.append((nickname, int(car_num)))
                 except ValueError as e:
-                    print(f"[CLIENT] Error processing player data: {e}")
-                    continue
-            
+                    log.warning("Error processing player data: %s", e)
+
+            if self.race_view is None:
+                self.initUI()
+            self.bg_widget.player_id = self.player_id
+            self.race_view.reset(self.race_text, players, bg_num)
+            log.info("Setting background: %s", self.bg_widget.bg_source.name)
+            self.applyTypingFeedback(True)
+            self.current_wpm = 0
+            self.elapsed_time = 0
+            self.time_timer.start(1000)
+
+            self.position_publisher.reset()
+            self.sendPosition(0.0)
+            for nickname, car_num in players:
+                if nickname == self.player_id:
+                    self.startGhost(car_num)
+
             self.show()
+            self.bg_widget.prerenderCars()
             if hasattr(self, 'room_window'):
+                if self.room_window.isVisible():
+                    net_log.info("Lobby closed, LIST| requests %s", self.lobby_sync.stats())
                 self.room_window.hide()
             
-            self.text_input.setEnabled(True) 
             self.text_input.setFocus()
-            
-            print("[CLIENT] Game started successfully!\n")
-            
-        except Exception as e:
-            print(f"[CLIENT] Error in startRace: {e}")
+
+            log.info("Race view reset in %.1f ms", (time.perf_counter() - self.race_started_at) * 1000)
+            log.info("Game started successfully!")
+
+        except Exception:
+            log.exception("Error in startRace")
 
 
     def createRoom(self):
         if self.room_id is not None:
             QMessageBox.warning(self, "Error", "You are already in a room!")
             return
-        self.network.send("CREATE|")
+        self.network.send(protocol.create_room())
 
 
     def joinRoom(self):
@@ -549,10 +1260,9 @@ class Client(QMainWindow):
             QMessageBox.warning(self, "Error", "You are already in a room!")
             return
                     
-        selected = self.room_list.currentItem()
-        if selected:
-            room_id = int(selected.text().split(" ")[1][:-1])
-            self.network.send(f"JOIN|{room_id}")
+        room_id = self.room_model.roomId(self.room_list.currentIndex().row())
+        if room_id is not None:
+            self.network.send(protocol.join_room(room_id))
             
 
     def sendPosition(self, progress=None):
@@ -560,36 +1270,35 @@ class Client(QMainWindow):
         if progress is None:
             return
         if hasattr(self, 'bg_widget') and self.bg_widget.player_id:
-            print(f"[CLIENT] Sending position update: {progress}")
-            self.network.send(f"UPDATE|{progress}")
+            log.debug("Sending position update: %s", progress)
+            self.position_publisher.publish(progress)
     
     def resetConnection(self):
         """Reset the network connection to allow for a new login attempt."""
         if self.network.connected and hasattr(self.network, 'socket'):
             try:
-                self.network.socket.shutdown(socket.SHUT_RDWR)
-                self.network.socket.close()
-                print("[CLIENT] Socket shut down and closed.")
+                self.network.close()
+                log.info("Socket shut down and closed.")
             except Exception as e:
-                print(f"[CLIENT] Error closing socket: {e}")
+                log.warning("Error closing socket: %s", e)
 
-        self.network = NetworkClient()
+        self.network = create_network_client(self.transport)
         self.network.connected = False
-        print("[CLIENT] NetworkClient reset.")
+        log.info("NetworkClient reset.")
         if self.server_thread and self.server_thread.is_alive():
             self.network.connected = False
             self.server_thread.join(timeout=1)
             if self.server_thread.is_alive():
-                print("[CLIENT] Warning: Communication thread did not terminate properly.")
+                log.warning("Communication thread did not terminate properly.")
             else:
-                print("[CLIENT] Communication thread terminated.")
+                log.info("Communication thread terminated.")
         self.server_thread = None
-        print("[CLIENT] Server communication thread reset.")
+        log.info("Server communication thread reset.")
 
     @pyqtSlot(str)
     def handleLoginError(self, message):
         """Handle login errors on the main thread."""
-        print(f"[CLIENT] Login error: {message}")
+        log.error("Login error: %s", message)
         self.resetConnection()
         QMessageBox.warning(self, "Error", message)
         self.login_dialog.nick_input.clear()
@@ -598,135 +1307,140 @@ class Client(QMainWindow):
         if not self.login_dialog.isVisible():
             self.login_dialog.show()
 
+    def buildDispatchTable(self):
+        return {
+            "ROOMS": self.onRoomsMessage,
+            "LEFT": self.onLeftMessage,
+            "CREATED": self.onCreatedMessage,
+            "JOIN": self.onJoinMessage,
+            "START": self.onStartMessage,
+            "END": self.game_ended.emit,
+            "POS": self.position_updated.emit,
+            "ROOM": self.onRoomMessage,
+            "TEXT": self.onTextMessage,
+            "ADMIN": self.onAdminMessage,
+            "ERROR": self.onErrorMessage,
+            "CAPS": self.onCapsMessage,
+        }
+
+    def dispatchMessage(self, msg):
+        if '|' not in msg:
+            return
+        cmd, payload = msg.split('|', 1)
+        handler = self.handlers.get(cmd)
+        if handler is not None:
+            handler(payload)
+
+    def onStartMessage(self, payload):
+        # Taken where messages are read, so binary POS frames right behind START| map to this race.
+        self.race_slots = tuple(player.partition('|')[2] for player in payload.split()[1:] if '|' in player)
+        self.game_started.emit(payload)
+
+    def onRoomsMessage(self, payload):
+        msg = "ROOMS|" + payload
+        if not hasattr(self, 'room_window'):
+            self.login_dialog.hide()
+            self.show_room_list_signal.emit(msg)
+        else:
+            self.room_list_updated.emit(msg)
+
+    def onLeftMessage(self, payload):
+        log.info("Successfully left the room.")
+        self.left_room_signal.emit()
+
+    def onCreatedMessage(self, payload):
+        self.room_id = int(payload)
+        self.is_admin = True
+        self.button_states_updated.emit()
+        self.room_joined.emit(1)
+
+    def onJoinMessage(self, payload):
+        self.room_id = int(payload)
+        self.is_admin = False
+        self.button_states_updated.emit()
+
+    def onRoomMessage(self, payload):
+        self.room_updated.emit(payload)
+
+    def onTextMessage(self, payload):
+        self.race_text = RaceText(payload.split("|")[0])
+        self.words_to_type = self.race_text.line_words[0]
+        self.current_word = self.words_to_type[0]
+
+    def onAdminMessage(self, payload):
+        self.admin_status_updated.emit()
+
+    def onCapsMessage(self, payload):
+        binary = CAPABILITY in payload.split(",")
+        self.position_publisher.fixed_point = binary
+        if binary:
+            net_log.info("Server sends positions as binary frames")
+
+    def onErrorMessage(self, payload):
+        if payload == "Nickname taken":
+            log.warning("Nickname taken error")
+            self.login_error_signal.emit("This nickname is already taken")
+        elif payload == "Game in progress":
+            self.server_error.emit("Cannot join the room: Game in progress.")
+        else:
+            net_log.warning("Error: %s", payload)
+            self.server_error.emit(payload)
+
+    def receiveMessages(self, framer):
+        data = self.network.socket.recv(4096)
+        if not data:
+            net_log.warning("Connection closed by server")
+            return False
+        for msg in framer.feed(data):
+            self.receivedMessage(msg)
+        return True
+
+    def receivedMessage(self, msg):
+        self.received_messages += 1
+        if isinstance(msg, PositionFrame):
+            slots = self.race_slots
+            if self.capture is not None:
+                self.capture.record(self.positionsText(slots, msg))
+            self.slot_positions_updated.emit((slots, msg))
+            return
+        if self.capture is not None:
+            self.capture.record(msg)
+        net_log.debug("Received: %s", msg)
+        self.dispatchMessage(msg)
+
     @pyqtSlot(str)
     def handleServerCommunication(self):
         """Main server communication thread"""
+        framer = WireFramer()
         try:
             self.network.socket.settimeout(5)
-            data = self.network.socket.recv(1024).decode()
-            if not data:
-                print("[NETWORK] Connection closed by server")
+            if not self.receiveMessages(framer):
                 self.network.connected = False
                 return
-            print(f"[NETWORK] Received: {data.strip()}")
-            messages = data.strip().split('\n')
-
-            for msg in messages:
-                if '|' not in msg:
-                    continue
-                cmd, payload = msg.split('|', 1)
-                if cmd == "ROOMS":
-                    if not hasattr(self, 'room_window'):
-                        self.login_dialog.hide()
-                        self.show_room_list_signal.emit(msg)
-                elif cmd == "LEFT":
-                    print("[CLIENT] Successfully left the room.")
-                    self.left_room_signal.emit()
-                elif cmd == "CREATED":
-                    self.room_id = int(payload)
-                    self.is_admin = True
-                    self.button_states_updated.emit()
-                elif cmd == "JOIN":
-                    self.room_id = int(payload)
-                    self.is_admin = False
-                    self.button_states_updated.emit()
-                elif cmd == "START":
-                    self.game_started.emit(payload)
-                elif cmd == "END":
-                    self.game_ended.emit(payload)
-                elif cmd == "POS":
-                    self.position_updated.emit(payload)
-                elif cmd == "ROOM":
-                    self.room_updated.emit(payload)
-                    self.network.send("LIST|\n")
-                elif cmd == "ADMIN":
-                    self.is_admin = True
-                    self.button_states_updated.emit()
-                elif cmd == "ERROR":
-                    if payload == "Nickname taken":
-                        print("[CLIENT] Nickname taken error")
-                        self.login_error_signal.emit("This nickname is already taken")
-                    elif payload == "Game in progress":
-                        QMessageBox.warning(self, "Error", "Cannot join the room: Game in progress.")
-                    else:
-                        print(f"[NETWORK] Error: {payload}")
-                        QMessageBox.warning(self, "Error", payload)
 
             self.network.socket.settimeout(None)
             while self.network.connected:
                 try:
-                    data = self.network.socket.recv(1024).decode()
-                    if not data:
-                        print("[NETWORK] Connection closed by server")
+                    if not self.receiveMessages(framer):
                         break
-                    print(f"[NETWORK] Received: {data.strip()}")
-                    messages = data.strip().split('\n')
-                    for msg in messages:
-                        if '|' not in msg:
-                            continue
-                        cmd, payload = msg.split('|', 1)
-                        if cmd == "ROOMS":
-                            if not hasattr(self, 'room_window'):
-                                self.login_dialog.hide()
-                                self.show_room_list_signal.emit(msg)
-                            else:
-                                self.room_list_updated.emit(msg)
-                        elif cmd == "LEFT":
-                            print("[CLIENT] Successfully left the room.")
-                            self.left_room_signal.emit()
-                        elif cmd == "CREATED":
-                            self.room_id = int(payload)
-                            self.is_admin = True
-                            self.button_states_updated.emit()
-                        elif cmd == "JOIN":
-                            self.room_id = int(payload)
-                            self.is_admin = False
-                            self.button_states_updated.emit()
-                        elif cmd == "START":
-                            self.game_started.emit(payload)
-                        elif cmd == "END":
-                            self.game_ended.emit(payload)
-                        elif cmd == "POS":
-                            self.position_updated.emit(payload)
-                        elif cmd == "ROOM":
-                            self.room_updated.emit(payload)
-                            self.network.send("LIST|\n")
-                        elif cmd == "TEXT":
-                            self.text = payload.split("|")
-                            self.text_lines = self.text[0].split("$")
-                            self.words_to_type = self.text_lines[0].split()
-                            self.current_word = self.words_to_type[0]
-                            self.total_words = sum(len(line.split()) for line in self.text_lines)
-                        elif cmd == "ADMIN":
-                            self.admin_status_updated.emit()
-                        elif cmd == "ERROR":
-                            if payload == "Nickname taken":
-                                print("[CLIENT] Nickname taken error")
-                                self.login_error_signal.emit("This nickname is already taken")
-                            elif payload == "Game in progress":
-                                QMessageBox.warning(self, "Error", "Cannot join the room: Game in progress.")
-                            else:
-                                print(f"[NETWORK] Error: {payload}")
-                                QMessageBox.warning(self, "Error", payload)
-                    
                 except Exception as e:
-                    print(f"[NETWORK] Error in communication thread: {e}")
+                    net_log.error("Error in communication thread: %s", e)
                     break
 
         except socket.timeout as e:
-            print(f"[NETWORK] Connection timeout: {e}")
+            net_log.error("Connection timeout: %s", e)
             self.network.connected = False
             self.network.socket.close()
             self.login_error_signal.emit("Connection timed out. Please check the server IP and try again.")
         except Exception as e:
-            print(f"[NETWORK] Unexpected error: {e}")
+            net_log.exception("Unexpected error: %s", e)
             self.network.connected = False
             self.network.socket.close()
             self.login_error_signal.emit("An unexpected error occurred.")
         finally:
             if self.network:
                 self.network.connected = False
-            print("[NETWORK] Communication thread ended")
+            net_log.info("Communication thread ended")
 
 
     @pyqtSlot(str)
@@ -736,26 +1450,40 @@ class Client(QMainWindow):
         try:
             data = data.replace("POS|", "").strip()
             pairs = [p.strip() for p in data.split() if p.strip()]
-            positions_debug = []
-            
             for pair in pairs:
                 try:
                     pos_str, nickname = pair.split('|')
-                    position = float(pos_str)
-                    self.bg_widget.updateCarPosition(nickname, position)
-                    positions_debug.append(f"{nickname} position set to: {position:.6f}\n")
+                    self.applyPosition(nickname, float(pos_str))
                 except (ValueError, IndexError) as e:
-                    print(f"[CLIENT] Error parsing position pair '{pair}': {e}")
+                    log.warning("Error parsing position pair '%s': %s", pair, e)
                     continue
-                    
-            if positions_debug:
-                print(f"[CLIENT] {' '.join(positions_debug)}")
-                
+
         except Exception as e:
-            print(f"[CLIENT] Error updating positions: {e}")
+            log.error("Error updating positions: %s", e)
+
+    def updateSlotPositions(self, frame):
+        """Binary POS frame: the START| nicknames it was read under and its (slot, progress) pairs."""
+        if not hasattr(self, 'bg_widget'):
+            return
+        slots, entries = frame
+        for slot, position in entries:
+            if slot < len(slots):
+                self.applyPosition(slots[slot], position)
+
+    def positionsText(self, slots, entries):
+        return "POS|" + "".join(f" {position:.6f}|{slots[slot]}" for slot, position in entries if slot < len(slots))
+
+    def applyPosition(self, nickname, position):
+        self.bg_widget.updateCarPosition(nickname, position)
+        if nickname == self.player_id:
+            rtt = self.position_publisher.acknowledge(position)
+            if rtt is not None:
+                self.rtt_samples.add(rtt * 1000)
+        log.debug("%s position set to: %.6f", nickname, position)
 
     def showRanking(self, data):
         self.game_finished = True
+        self.stopGhost()
         """Handle game end and show rankings"""
         rankings = data.split("|")
         
@@ -772,12 +1500,7 @@ class Client(QMainWindow):
             self.showRestartButton()
             
     def showRestartButton(self):
-        self.restart_button = QPushButton("Play Again")
-        self.restart_button.setFixedSize(200, 50)
-        self.restart_button.setFont(QFont("Arial", 16))
-        self.restart_button.clicked.connect(self.restart_game)
-        layout = self.centralWidget().layout()
-        layout.addWidget(self.restart_button, 0, Qt.AlignCenter)
+        self.restart_button.show()
         self.restart_button.setFocus()
 
     @pyqtSlot()
@@ -790,114 +1513,490 @@ class Client(QMainWindow):
             self.next_line_label.setText(self.next_line_label.text() + "\n\nYou are now the admin.")
             self.showRestartButton()
 
-class BackgroundWidget(QSvgWidget):
-    def __init__(self, svg_file, parent=None):
-        super().__init__(svg_file, parent)
-        self.bg_renderer = self.renderer()
-        self.cars = {}  
-        self.car_renderers = {}
-        self.player_id = None
-    
+def fit_background_rect(bg_size, widget_width, widget_height):
+    """Largest rect with the background's aspect ratio that fits the widget, centered horizontally."""
+    bg_aspect = bg_size.width() / bg_size.height()
+
+    target_width = widget_width
+    target_height = widget_width / bg_aspect
+
+    if target_height > widget_height:
+        target_height = widget_height
+        target_width = widget_height * bg_aspect
+
+    x = (widget_width - target_width) / 2
+    y = 0
+    return QRectF(x, y, target_width, target_height)
+
+
+def rasterize_svg(renderer, width, height, dpr=1.0, background=Qt.transparent):
+    """Render an SVG into a QImage. Safe off the GUI thread with a renderer owned by that thread."""
+    image = QImage(max(1, int(width * dpr)), max(1, int(height * dpr)), QImage.Format_ARGB32_Premultiplied)
+    image.setDevicePixelRatio(dpr)
+    image.fill(background)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    renderer.render(painter, QRectF(0, 0, width, height))
+    painter.end()
+    return image
 
 
-        self.y_offsets_config = {
-            'resources/background/bg1.svg': [0.87],
-            'resources/background/bg2.svg': [0.67, 0.9],
-            'resources/background/bg3.svg': [0.55, 0.73, 0.9],
-            'resources/background/bg4.svg': [0.46, 0.62, 0.77, 0.93],
-        }
+raster_cache = RasterCache(read_config_value("raster_cache_dir", "cache", str),
+                           read_config_value("raster_cache_mb", 64) * 1024 * 1024)
+
+
+class SvgSource:
+    """An SVG file that is only parsed when none of its rasters are on disk."""
+    def __init__(self, path):
+        self.path = path
+        self.renderer = None
+
+    def svgRenderer(self):
+        if self.renderer is None:
+            self.renderer = QSvgRenderer(self.path)
+        return self.renderer
+
+    def defaultSize(self):
+        size = raster_cache.source_size(self.path)
+        if size is None:
+            size = self.svgRenderer().defaultSize()
+        return size
+
+    def image(self, width, height, dpr=1.0, background=Qt.transparent, persist=False):
+        image = raster_cache.load(self.path, width, height, dpr)
+        if image is None:
+            image = rasterize_svg(self.svgRenderer(), width, height, dpr, background)
+            # Only the prerenderer persists, so one-off sizes from a resize stay off disk.
+            if persist:
+                raster_cache.store(self.path, width, height, dpr, image, self.defaultSize())
+        return image
+
+
+class LayeredSvgRenderer:
+    """Paints several SVG files on top of each other, all cropped to one view box."""
+    def __init__(self, paths, view_box):
+        self.view_box = view_box
+        self.renderers = []
+        for path in paths:
+            renderer = QSvgRenderer(path)
+            renderer.setViewBox(view_box)
+            self.renderers.append(renderer)
+
+    def defaultSize(self):
+        return self.view_box.size().toSize()
+
+    def render(self, painter, bounds):
+        for renderer in self.renderers:
+            renderer.render(painter, bounds)
+
+
+class BackgroundVariant(SvgSource):
+    """Race background for a number of lanes: shared base scenery plus a lane overlay."""
+    def __init__(self, directory, metadata, variant):
+        super().__init__((os.path.join(directory, metadata["base"]),
+                          os.path.join(directory, variant["overlay"])))
+        self.directory = directory
+        self.metadata = metadata
+        self.variant = variant
+        self.name = os.path.join(directory, variant["overlay"])
+        self.lanes = variant["lanes"]
+        self.size = QSize(int(metadata["width"]), int(variant["height"]))
+        self.lane_offsets = variant["lane_offsets"]
+        self.car_height_ratio = variant["car_height_ratio"]
+
+    def copy(self):
+        return BackgroundVariant(self.directory, self.metadata, self.variant)
 
-        self.CAR_HEIGHT_RATIOS = {
-            'resources/background/bg1.svg': 0.15,
-            'resources/background/bg2.svg': 0.12,
-            'resources/background/bg3.svg': 0.09,
-            'resources/background/bg4.svg': 0.07,
+    def svgRenderer(self):
+        if self.renderer is None:
+            self.renderer = LayeredSvgRenderer(self.path, QRectF(0, 0, self.size.width(), self.size.height()))
+        return self.renderer
+
+    def defaultSize(self):
+        return QSize(self.size)
+
+
+def load_background_variants(directory='resources/background'):
+    with open(os.path.join(directory, 'backgrounds.json'), 'r') as f:
+        metadata = json.load(f)
+    return {variant["lanes"]: BackgroundVariant(directory, metadata, variant) for variant in metadata["variants"]}
+
+
+background_variants = {}
+
+
+def background_variant(lanes):
+    """The background for the given number of lanes, loading backgrounds.json on first use."""
+    if not background_variants:
+        background_variants.update(load_background_variants())
+    lanes = max(1, min(lanes, max(background_variants)))
+    return background_variants[lanes]
+
+
+# Prerendered backgrounds keyed like BackgroundWidget's cache; popped when a widget uses one.
+PRERENDERED_BACKGROUNDS_MAX = 2
+prerendered_backgrounds = OrderedDict()
+
+
+class CarSpriteCache:
+    """Process-wide cache of rasterized car sprites keyed by (car_number, pixel height, DPR)."""
+    CAR_COUNT = 12
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.sources = {}
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def source(self, car_number):
+        if car_number not in self.sources:
+            self.sources[car_number] = SvgSource(f'resources/cars/{car_number}.svg')
+        return self.sources[car_number]
+
+    def aspect(self, car_number):
+        car_size = self.source(car_number).defaultSize()
+        return car_size.width() / car_size.height()
+
+    def get(self, car_number, height, dpr=1.0):
+        key = (car_number, int(height), dpr)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        height = max(1, int(height))
+        width = max(1, round(height * self.aspect(car_number)))
+        sprite = QPixmap.fromImage(self.source(car_number).image(width, height, dpr))
+        self.store(key, sprite)
+        return sprite
+
+    def store(self, key, sprite):
+        self.sprites[key] = sprite
+        self.sprites.move_to_end(key)
+        while len(self.sprites) > self.max_entries:
+            self.sprites.popitem(last=False)
+
+    def prerender(self, height, dpr=1.0):
+        for car_number in range(1, self.CAR_COUNT + 1):
+            self.get(car_number, height, dpr)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.sprites)}
+
+
+car_sprites = CarSpriteCache()
+
+
+class RaceAssetPrerenderer(QObject):
+    """Rasterizes a race's background and car sprites on a worker thread when we join a room."""
+    finished = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.finished.connect(self.install)
+        self.thread = None
+        self.pending = None
+        self.completed = set()
+        self.last_timings = None
+
+    def request(self, lanes, widget_size, dpr):
+        job = (lanes, widget_size.width(), widget_size.height(), dpr)
+        if job in self.completed:
+            return
+        if self.thread is not None and self.thread.is_alive():
+            self.pending = job
+            return
+        self.pending = None
+        # QSvgRenderers are not shared across threads, so each job gets its own sources.
+        self.thread = threading.Thread(target=self.run, args=job + (background_variant(lanes).copy(),))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self, lanes, widget_width, widget_height, dpr, source):
+        job = (lanes, widget_width, widget_height, dpr)
+        started = time.perf_counter()
+        rect = fit_background_rect(source.defaultSize(), widget_width, widget_height)
+        width, height = int(rect.width()), int(rect.height())
+        background = None
+        if (source.name, width, height, dpr) not in prerendered_backgrounds:
+            background = source.image(width, height, dpr, Qt.white, persist=True)
+        background_done = time.perf_counter()
+
+        car_height = max(1, int(rect.height() * source.car_height_ratio))
+        cars = {}
+        for car_number in range(1, CarSpriteCache.CAR_COUNT + 1):
+            key = (car_number, car_height, dpr)
+            if key in car_sprites.sprites:
+                continue
+            car_source = SvgSource(f'resources/cars/{car_number}.svg')
+            car_size = car_source.defaultSize()
+            car_width = max(1, round(car_height * car_size.width() / car_size.height()))
+            cars[key] = car_source.image(car_width, car_height, dpr, persist=True)
+        done = time.perf_counter()
+
+        timings = {
+            "background_ms": (background_done - started) * 1000,
+            "cars_ms": (done - background_done) * 1000,
+            "total_ms": (done - started) * 1000,
         }
+        self.finished.emit((job, (source.name, width, height, dpr), background, cars, timings))
+
+    def install(self, result):
+        job, key, background, cars, timings = result
+        self.completed.add(job)
+        if background is not None:
+            prerendered_backgrounds[key] = background
+            prerendered_backgrounds.move_to_end(key)
+            while len(prerendered_backgrounds) > PRERENDERED_BACKGROUNDS_MAX:
+                prerendered_backgrounds.popitem(last=False)
+        for car_key, image in cars.items():
+            car_sprites.store(car_key, QPixmap.fromImage(image))
+        self.last_timings = timings
+        render_log.info("Pre-rasterized %s at %sx%s and %d cars in %.1f ms (background %.1f, cars %.1f, "
+                        "raster cache %s)", key[0], key[1], key[2], len(cars), timings['total_ms'],
+                        timings['background_ms'], timings['cars_ms'], raster_cache.stats())
+        if self.pending is not None:
+            lanes, width, height, dpr = self.pending
+            self.request(lanes, QSize(width, height), dpr)
+
+
+GHOST_NICKNAME = "__ghost__"
+
+
+class BackgroundWidget(QWidget):
+    first_frame = pyqtSignal()
+
+    ANIMATION_INTERVAL_MS = 16
+    ANIMATION_TIME_CONSTANT = 0.08
+    ANIMATION_SNAP_DISTANCE = 0.0005
+    GHOST_OPACITY = 0.4
+
+    def __init__(self, lanes=1, parent=None):
+        super().__init__(parent)
+        self.bg_source = background_variant(lanes)
+        self.bg_cache = None
+        self.bg_cache_key = None
+        self.bg_cache_hits = 0
+        self.bg_cache_misses = 0
+        self.cars = {}  
+        self.car_targets = {}
+        self.ghosts = set()
+        self.player_id = None
+        self.first_frame_pending = False
+        self.paint_times = RollingSamples()
+
+        self.animation_timer = QTimer(self)
+        self.animation_timer.setTimerType(Qt.PreciseTimer)
+        self.animation_timer.setInterval(self.ANIMATION_INTERVAL_MS)
+        self.animation_timer.timeout.connect(self.animateCars)
+        self.last_tick = 0.0
+    
+
 
         self.current_y_offsets = []
         self.CAR_HEIGHT_RATIO = 0.9
 
-    def setBackground(self, bg_file):
-        self.load(bg_file)
-        self.bg_renderer = self.renderer()
+    def setBackground(self, lanes):
+        bg_source = background_variant(lanes)
+        if bg_source is not self.bg_source:
+            self.bg_source = bg_source
+            self.invalidateBackgroundCache()
+        self.first_frame_pending = True
         self.update()
         
-        self.current_y_offsets = self.y_offsets_config.get(bg_file, [0])
-        self.CAR_HEIGHT_RATIO = self.CAR_HEIGHT_RATIOS.get(bg_file, 0.90)
+        self.current_y_offsets = self.bg_source.lane_offsets
+        self.CAR_HEIGHT_RATIO = self.bg_source.car_height_ratio
+        self.updateGeometry()
+
+    def sizeHint(self):
+        return self.bg_source.defaultSize()
+
+    def clearCars(self):
+        self.animation_timer.stop()
+        self.cars.clear()
+        self.car_targets.clear()
+        self.ghosts.clear()
+        self.update()
 
     def addCar(self, nickname, car_number):
-        y_offset_index = len(self.cars)
+        y_offset_index = len(self.cars) - len(self.ghosts)
         if y_offset_index < len(self.current_y_offsets):
             y_offset = self.current_y_offsets[y_offset_index]
         else:
             y_offset = self.current_y_offsets[-1] + 60 * (y_offset_index - len(self.current_y_offsets) + 1)
         
         self.cars[nickname] = [car_number, 0.0, y_offset]
-        self.car_renderers[nickname] = QSvgRenderer(f'resources/cars/{car_number}.svg')
+        self.car_targets[nickname] = 0.0
+        self.update()
+
+    def addGhost(self, nickname, car_number, lane_of):
+        """Add a translucent car sharing the lane of the car lane_of."""
+        y_offset = self.cars[lane_of][2] if lane_of in self.cars else self.current_y_offsets[0]
+        self.cars[nickname] = [car_number, 0.0, y_offset]
+        self.car_targets[nickname] = 0.0
+        self.ghosts.add(nickname)
         self.update()
 
     def updateCarPosition(self, nickname, position):
         if nickname in self.cars:
-            self.cars[nickname][1] = position
-            self.update()
+            self.car_targets[nickname] = position
+            if not self.animation_timer.isActive():
+                self.last_tick = time.perf_counter()
+                self.animation_timer.start()
+
+    def animateCars(self):
+        """Ease every car toward its target and repaint only the area it moved through."""
+        now = time.perf_counter()
+        step = 1.0 - math.exp(-(now - self.last_tick) / self.ANIMATION_TIME_CONSTANT)
+        self.last_tick = now
+
+        bg_rect = self.backgroundRect()
+        moving = False
+        for nickname, car in self.cars.items():
+            target = self.car_targets.get(nickname, car[1])
+            if car[1] == target:
+                continue
+            old_rect = self.carRect(car[0], car[1], car[2], bg_rect)
+            delta = target - car[1]
+            if abs(delta) < self.ANIMATION_SNAP_DISTANCE:
+                car[1] = target
+            else:
+                car[1] += delta * step
+                moving = True
+            new_rect = self.carRect(car[0], car[1], car[2], bg_rect)
+            self.update(old_rect.united(new_rect).toAlignedRect().adjusted(-1, -1, 1, 1))
+
+        if not moving:
+            self.animation_timer.stop()
 
     def set_car_position(self, position):
         if self.player_id and self.player_id in self.cars:
             self.updateCarPosition(self.player_id, position)
 
+    def prerenderCars(self):
+        car_height = int(self.backgroundRect().height() * self.CAR_HEIGHT_RATIO)
+        car_sprites.prerender(car_height, self.devicePixelRatioF())
+
+    def invalidateBackgroundCache(self):
+        self.bg_cache = None
+        self.bg_cache_key = None
+
+    def cacheStats(self):
+        return {"hits": self.bg_cache_hits, "misses": self.bg_cache_misses}
+
+    def backgroundRect(self):
+        return fit_background_rect(self.bg_source.defaultSize(), self.width(), self.height())
+
+    def carRect(self, car_number, position, y_offset, bg_rect):
+        x, y = bg_rect.x(), bg_rect.y()
+        target_width, target_height = bg_rect.width(), bg_rect.height()
+
+        car_height = max(1, int(target_height * self.CAR_HEIGHT_RATIO))
+        car_width = max(1, round(car_height * car_sprites.aspect(car_number)))
+
+        usable_width = target_width - car_width
+        car_x = x + (position * usable_width)
+
+        car_y = y + target_height * y_offset - car_height / 2
+
+        car_y = max(y, min(car_y, y + target_height - car_height))
+
+        return QRectF(int(car_x), int(car_y), car_width, car_height)
+
+    def backgroundPixmap(self, target_width, target_height):
+        """Return the background rasterized at the given size, rendering the SVG only on a cache miss."""
+        dpr = self.devicePixelRatioF()
+        key = (self.bg_source.name, int(target_width), int(target_height), dpr)
+        if self.bg_cache is not None and self.bg_cache_key == key:
+            self.bg_cache_hits += 1
+            return self.bg_cache
+
+        self.bg_cache_misses += 1
+        image = prerendered_backgrounds.pop(key, None)
+        if image is None:
+            image = self.bg_source.image(int(target_width), int(target_height), dpr, Qt.white)
+        pixmap = QPixmap.fromImage(image)
+
+        self.bg_cache = pixmap
+        self.bg_cache_key = key
+        render_log.debug("Background cache miss for %s (hits: %d, misses: %d)",
+                         key, self.bg_cache_hits, self.bg_cache_misses)
+        return pixmap
 
     def paintEvent(self, event):
+        started = time.perf_counter()
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
         painter.setRenderHint(QPainter.SmoothPixmapTransform)
         
         painter.fillRect(self.rect(), Qt.white)
-        
-        bg_size = self.bg_renderer.defaultSize()
-        
-        widget_width = self.width()
-        widget_height = self.height()
-        bg_aspect = bg_size.width() / bg_size.height()
-
-
-        target_width = widget_width
-        target_height = widget_width / bg_aspect
-        
-        if target_height > widget_height:
-            target_height = widget_height
-            target_width = widget_height * bg_aspect
-            
-        x = (widget_width - target_width) / 2
-        y = 0
 
-        clip_rect = QRectF(x, y, target_width, target_height)
+        clip_rect = self.backgroundRect()
+        x, y = clip_rect.x(), clip_rect.y()
+        target_width, target_height = clip_rect.width(), clip_rect.height()
         painter.setClipRect(clip_rect)
-        self.bg_renderer.render(painter, clip_rect)
+        painter.drawPixmap(int(x), int(y), self.backgroundPixmap(target_width, target_height))
         
+        dpr = self.devicePixelRatioF()
         for nickname, (car_number, position, y_offset) in self.cars.items():
-            if nickname in self.car_renderers:
-                car_renderer = self.car_renderers[nickname]
-                car_size = car_renderer.defaultSize()
-                car_aspect = car_size.width() / car_size.height()
-                
-                car_height = target_height * self.CAR_HEIGHT_RATIO
-                
-                car_width = car_height * car_aspect
-                
-                usable_width = target_width - car_width
-                car_x = x + (position * usable_width)
-                
-                car_y = y + target_height * y_offset - car_height / 2
-                
-                car_y = max(y, min(car_y, y + target_height - car_height))
-
-                car_bounds = QRectF(car_x, car_y, car_width, car_height)
-                car_renderer.render(painter, car_bounds)
+            car_rect = self.carRect(car_number, position, y_offset, clip_rect)
+            sprite = car_sprites.get(car_number, car_rect.height(), dpr)
+            if nickname in self.ghosts:
+                painter.setOpacity(self.GHOST_OPACITY)
+                painter.drawPixmap(int(car_rect.x()), int(car_rect.y()), sprite)
+                painter.setOpacity(1.0)
+            else:
+                painter.drawPixmap(int(car_rect.x()), int(car_rect.y()), sprite)
 
         painter.end()
+        self.paint_times.add((time.perf_counter() - started) * 1000)
+        if self.first_frame_pending:
+            self.first_frame_pending = False
+            self.first_frame.emit()
 
 if __name__ == '__main__':
     os.environ['QT_QPA_PLATFORM'] = 'xcb'
     app = QApplication(sys.argv)
-    client = Client()
+    transport = None
+    log_level = read_config_value("log_level", "info", str)
+    stall_ms = int(os.environ.get("TYPERACER_STALL_MS", read_config_value("stall_ms", 250)))
+    profile = os.environ.get("TYPERACER_PROFILE", "")
+    capture = os.environ.get("TYPERACER_CAPTURE")
+    hud = False
+    for arg in sys.argv[1:]:
+        if arg.startswith("--transport="):
+            transport = arg.split("=", 1)[1]
+        elif arg.startswith("--log-level="):
+            log_level = arg.split("=", 1)[1]
+        elif arg.startswith("--stall-ms="):
+            stall_ms = int(arg.split("=", 1)[1])
+        elif arg.startswith("--profile="):
+            profile = arg.split("=", 1)[1]
+        elif arg.startswith("--capture="):
+            capture = arg.split("=", 1)[1]
+        elif arg == "--hud":
+            hud = True
+    setup_logging(os.environ.get("TYPERACER_LOG", log_level))
+    profile_modes = parse_profile_modes(profile)
+    if profile_modes:
+        profiler = HookProfiler(profile_modes, read_config_value("profile_dir", "profiles", str))
+        profiler.instrument(BackgroundWidget, "paintEvent")
+        profiler.instrument(Client, "on_text_changed")
+        profiler.instrument(Client, "dispatchMessage")
+        profiler.start()
+    watchdog = None
+    if stall_ms > 0:
+        watchdog = StallWatchdog(stall_ms)
+        watchdog.start()
+    client = Client(transport)
+    client.watchdog = watchdog
+    if capture:
+        client.capture = TrafficCapture(capture)
+        app.aboutToQuit.connect(client.capture.close)
+        log.info("Capturing server traffic to %s", capture)
+    if hud:
+        client.setPerfHudVisible(True)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""Text wire protocol shared by the client and the Python tooling.
+
+Every message is one line: COMMAND|payload\n
+"""
+
+MAX_PLAYERS_PER_ROOM = 4
+
+
+class LineFramer:
+    """Splits a byte stream into newline-terminated messages.
+
+    Bytes are buffered until a full line is available, so messages split across
+    recv() calls (including multibyte UTF-8 characters) are reassembled intact.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer += data
+        end = self.buffer.rfind(b'\n')
+        if end < 0:
+            return []
+        complete = bytes(self.buffer[:end])
+        del self.buffer[:end + 1]
+        messages = []
+        for line in complete.split(b'\n'):
+            line = line.decode('utf-8', errors='replace').strip()
+            if line:
+                messages.append(line)
+        return messages
+
+
+def split_message(msg):
+    if '|' not in msg:
+        return None, None
+    return msg.split('|', 1)
+
+
+def login(nickname, capabilities=()):
+    if capabilities:
+        return f"LOGIN|{nickname}|{','.join(capabilities)}\n"
+    return f"LOGIN|{nickname}\n"
+
+
+def create_room():
+    return "CREATE|\n"
+
+
+def join_room(room_id):
+    return f"JOIN|{room_id}\n"
+
+
+def start_game():
+    return "START|\n"
+
+
+def update_position(progress):
+    return f"UPDATE|{progress}\n"
+
+
+def list_rooms():
+    return "LIST|\n"
+
+
+def leave_room(nickname, room_id):
+    return f"LEAVE|{nickname}|{room_id}\n"
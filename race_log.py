@@ -0,0 +1,166 @@
+import os
+import mmap
+import time
+import zlib
+import struct
+from array import array
+
+# Race log layout (little-endian):
+#   header  magic, version, flags, count, total_words, total_chars, text_crc32, started_at_ns,
+#           first_key_ns (the first keystroke's offset from START|, version 2 only)
+#   times   int64[count]   ns since the first keystroke (time.perf_counter_ns)
+#   keys    uint16[count]  typed character code point, KEY_BACKSPACE or KEY_ENTER
+#   words   uint16[count]  flat index of the word being typed
+#   correct uint8[count]   1 if the input matched the word after the key
+HEADER = struct.Struct('<4sHHIIIIqq')
+HEADER_V1 = struct.Struct('<4sHHIIIIq')
+MAGIC = b'TRKL'
+VERSION = 2
+
+KEY_BACKSPACE = 0x08
+KEY_ENTER = 0x0D
+
+
+def text_checksum(text):
+    return zlib.crc32(text.encode())
+
+
+class KeystrokeRecorder:
+    """Per-keystroke telemetry kept in flat typed arrays, one column per field."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.times = array('q')
+        self.keys = array('H')
+        self.words = array('H')
+        self.correct = array('B')
+        self.start_ns = None
+        self.started_at_ns = 0
+        # reset() runs when START| arrives, so this is the race's start.
+        self.race_start_ns = time.perf_counter_ns()
+
+    def record(self, key, word_index, correct):
+        now = time.perf_counter_ns()
+        if self.start_ns is None:
+            self.start_ns = now
+            self.started_at_ns = time.time_ns()
+        self.times.append(now - self.start_ns)
+        self.keys.append(min(key, 0xFFFF))
+        self.words.append(min(word_index, 0xFFFF))
+        self.correct.append(1 if correct else 0)
+
+    def __len__(self):
+        return len(self.times)
+
+    def write(self, path, total_words, total_chars, text_crc):
+        first_key_ns = self.start_ns - self.race_start_ns if self.start_ns is not None else 0
+        header = HEADER.pack(MAGIC, VERSION, 0, len(self.times), total_words, total_chars,
+                             text_crc, self.started_at_ns, first_key_ns)
+        # 'x' so a log is never overwritten, even by another client sharing the directory.
+        with open(path, 'xb') as f:
+            f.write(header)
+            self.times.tofile(f)
+            self.keys.tofile(f)
+            self.words.tofile(f)
+            self.correct.tofile(f)
+        return path
+
+
+class RaceLog:
+    """Memory-mapped view of a race log; columns are zero-copy memoryviews."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = unpack_header(self.map)
+        if fields is None:
+            self.map.close()
+            raise ValueError(f"{path} is not a race log")
+        (_, version, _, self.count, self.total_words, self.total_chars,
+         self.text_crc, self.started_at_ns, self.first_key_ns) = fields
+
+        view = memoryview(self.map)
+        offset = header_size(version)
+        self.times = view[offset:offset + 8 * self.count].cast('q')
+        offset += 8 * self.count
+        self.keys = view[offset:offset + 2 * self.count].cast('H')
+        offset += 2 * self.count
+        self.words = view[offset:offset + 2 * self.count].cast('H')
+        offset += 2 * self.count
+        self.correct = view[offset:offset + self.count]
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.times.release()
+        self.keys.release()
+        self.words.release()
+        self.correct.release()
+        self.map.close()
+
+
+def race_log_path(directory, player_id):
+    os.makedirs(directory, exist_ok=True)
+    now_ns = time.time_ns()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now_ns // 1000000000))
+    stamp += f"{now_ns // 1000000 % 1000:03d}"
+    path = os.path.join(directory, f"{stamp}-{player_id}.trk")
+    attempt = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{stamp}.{attempt}-{player_id}.trk")
+        attempt += 1
+    return path
+
+
+def header_size(version):
+    return HEADER.size if version >= 2 else HEADER_V1.size
+
+
+def unpack_header(data):
+    """Header fields of either version; version 1 logs get a first_key_ns of 0."""
+    if len(data) < HEADER_V1.size:
+        return None
+    fields = HEADER_V1.unpack_from(data, 0)
+    if fields[0] != MAGIC:
+        return None
+    if fields[1] == 1:
+        return fields + (0,)
+    if fields[1] == VERSION and len(data) >= HEADER.size:
+        return HEADER.unpack_from(data, 0)
+    return None
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        return unpack_header(f.read(HEADER.size))
+
+
+def finish_time_ns(path, header):
+    """Time from START| to the last keystroke."""
+    with open(path, 'rb') as f:
+        f.seek(header_size(header[1]) + 8 * (header[3] - 1))
+        return header[8] + struct.unpack('<q', f.read(8))[0]
+
+
+def find_race_log(directory, text_crc, player_id=None, best=False):
+    """Pick a log for this text: the fastest one if best, else the newest one by player_id."""
+    if not os.path.isdir(directory):
+        return None
+    candidates = []
+    for name in os.listdir(directory):
+        if not name.endswith(".trk"):
+            continue
+        path = os.path.join(directory, name)
+        header = read_header(path)
+        if header is None or header[6] != text_crc or header[3] == 0:
+            continue
+        if not best and name[:-4].split("-", 2)[-1] != player_id:
+            continue
+        candidates.append((path, header))
+    if not candidates:
+        return None
+    if best:
+        return min(candidates, key=lambda c: finish_time_ns(c[0], c[1]))[0]
+    return max(candidates, key=lambda c: c[1][7])[0]
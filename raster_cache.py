@@ -0,0 +1,166 @@
+"""On-disk cache of rasterized SVGs.
+
+Entries are keyed by a hash of the SVG's contents (of all layers, for
+images composed from several files), the logical target size
+and the device pixel ratio, and hold raw premultiplied ARGB32 pixels behind
+a small header. A hit memory-maps the entry and copies the pixels straight
+into a QImage, so a warm start never runs the SVG parser. The header also
+records the SVG's default size, which lets callers lay out an image without
+loading its source.
+
+The directory is capped at max_bytes. Hits refresh an entry's mtime and the
+oldest entries are evicted first.
+"""
+import os
+import mmap
+import struct
+import hashlib
+import logging
+import threading
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QImage
+
+# Entry layout (little-endian):
+#   header  magic, version, width_px, height_px, bytes_per_line, source_width, source_height, dpr
+#   pixels  uint8[bytes_per_line * height_px], QImage.Format_ARGB32_Premultiplied
+HEADER = struct.Struct('<4sHIIIIId')
+MAGIC = b'TRRC'
+VERSION = 1
+SUFFIX = '.raster'
+IMAGE_FORMAT = QImage.Format_ARGB32_Premultiplied
+
+log = logging.getLogger("typeracer.render")
+
+
+class RasterCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.digests = {}
+        self.source_sizes = {}
+        self.total_bytes = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def digest(self, path):
+        """Content hash of a file, or of several files drawn as one image when path is a tuple."""
+        if isinstance(path, tuple):
+            return hashlib.sha1("".join(self.digest(part) for part in path).encode()).hexdigest()[:20]
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self.digests.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:20]
+        self.digests[path] = (stamp, digest)
+        return digest
+
+    def entry_path(self, digest, width, height, dpr):
+        return os.path.join(self.directory, f"{digest}-{int(width)}x{int(height)}@{dpr:g}{SUFFIX}")
+
+    def load(self, path, width, height, dpr=1.0):
+        """Return the cached raster of path as a QImage, or None on a miss."""
+        try:
+            digest = self.digest(path)
+            entry = self.entry_path(digest, width, height, dpr)
+            with open(entry, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                image = self.read_entry(digest, data)
+            os.utime(entry)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return image
+
+    def read_entry(self, digest, data):
+        (magic, version, width_px, height_px, bytes_per_line,
+         source_width, source_height, dpr) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a raster cache entry")
+        image = QImage(width_px, height_px, IMAGE_FORMAT)
+        if image.bytesPerLine() != bytes_per_line or len(data) != HEADER.size + bytes_per_line * height_px:
+            raise ValueError("raster cache entry does not match its header")
+        bits = image.bits()
+        bits.setsize(image.sizeInBytes())
+        with memoryview(data) as view:
+            memoryview(bits)[:] = view[HEADER.size:]
+        image.setDevicePixelRatio(dpr)
+        self.source_sizes[digest] = QSize(source_width, source_height)
+        return image
+
+    def store(self, path, width, height, dpr, image, source_size):
+        image = image.convertToFormat(IMAGE_FORMAT)
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        header = HEADER.pack(MAGIC, VERSION, image.width(), image.height(), image.bytesPerLine(),
+                             source_size.width(), source_size.height(), dpr)
+        try:
+            digest = self.digest(path)
+            os.makedirs(self.directory, exist_ok=True)
+            entry = self.entry_path(digest, width, height, dpr)
+            temp = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp, 'wb') as f:
+                f.write(header)
+                f.write(memoryview(bits))
+            os.replace(temp, entry)
+        except OSError as e:
+            log.warning("Could not write raster cache entry: %s", e)
+            return
+        self.source_sizes[digest] = QSize(source_size)
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += len(header) + image.sizeInBytes()
+            self.evict()
+
+    def source_size(self, path):
+        """Default size of the SVG at path as recorded by any cached raster of it, or None."""
+        try:
+            digest = self.digest(path)
+        except OSError:
+            return None
+        if digest not in self.source_sizes:
+            for name in self.entries():
+                if name.startswith(digest + "-"):
+                    try:
+                        with open(os.path.join(self.directory, name), 'rb') as f:
+                            fields = HEADER.unpack(f.read(HEADER.size))
+                    except (OSError, struct.error):
+                        continue
+                    if fields[0] == MAGIC and fields[1] == VERSION:
+                        self.source_sizes[digest] = QSize(fields[5], fields[6])
+                        break
+        return self.source_sizes.get(digest)
+
+    def entries(self):
+        try:
+            return [name for name in os.listdir(self.directory) if name.endswith(SUFFIX)]
+        except OSError:
+            return []
+
+    def evict(self):
+        if self.total_bytes is not None and self.total_bytes <= self.max_bytes:
+            return
+        files = []
+        for name in self.entries():
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, name))
+        self.total_bytes = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
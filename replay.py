@@ -0,0 +1,200 @@
+"""Replays a captured session into the client, with no server and no socket.
+
+A capture is recorded by running the client with --capture=FILE (or
+TYPERACER_CAPTURE=FILE). This script builds a Client logged in under the
+captured nickname and passes every captured line to Client.receivedMessage
+from the Qt event loop, the way the qt transport does. Lines are replayed
+on the original schedule (--speed 1), faster (--speed 10) or back to back
+(--speed max). Painting, animation and timers run as they do in a real
+session. The same capture therefore reproduces the same burst of POS|,
+ROOM| and ROOMS| lines every time.
+
+A 16 ms frame clock runs alongside. Whenever its timer fires late by a
+whole frame or more, the missed ticks count as dropped frames. At the end
+the script reports CPU time, time spent in dispatch, dropped frames and
+paint times.
+
+Usage:
+    python3 klient.py --capture=laggy.trc
+    QT_QPA_PLATFORM=offscreen python3 replay.py laggy.trc --speed 10
+    QT_QPA_PLATFORM=offscreen python3 replay.py laggy.trc --speed max --json
+"""
+import sys
+import json
+import time
+import argparse
+
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+
+import klient
+from traffic_log import Capture
+
+
+class FrameMonitor(QObject):
+    """Counts frames a frame_ms clock on the GUI thread failed to tick."""
+    def __init__(self, frame_ms=16):
+        super().__init__()
+        self.frame_s = frame_ms / 1000
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(frame_ms)
+        self.timer.timeout.connect(self.tick)
+        self.last = None
+        self.ticks = 0
+        self.dropped = 0
+        self.longest_gap = 0.0
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def tick(self):
+        now = time.perf_counter()
+        gap = now - self.last
+        self.last = now
+        self.ticks += 1
+        self.longest_gap = max(self.longest_gap, gap)
+        missed = int(gap / self.frame_s) - 1
+        if missed > 0:
+            self.dropped += missed
+
+
+class Replayer(QObject):
+    finished = pyqtSignal()
+
+    def __init__(self, client, capture, speed=None):
+        super().__init__()
+        self.client = client
+        self.records = capture.records
+        self.speed = speed
+        self.position = 0
+        self.started = None
+        self.finished_at = None
+        self.dispatch_s = 0.0
+        self.worst_dispatch_s = 0.0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.step)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.timer.start(0)
+
+    def dispatch(self, line):
+        begin = time.perf_counter()
+        self.client.receivedMessage(line)
+        elapsed = time.perf_counter() - begin
+        self.dispatch_s += elapsed
+        self.worst_dispatch_s = max(self.worst_dispatch_s, elapsed)
+
+    def step(self):
+        if self.speed is None:
+            # Back to back, one line per pass of the event loop so paints
+            # and timers still get their turn.
+            self.dispatch(self.records[self.position][1])
+            self.position += 1
+        else:
+            due_ns = (time.perf_counter() - self.started) * self.speed * 1e9
+            while self.position < len(self.records) and self.records[self.position][0] <= due_ns:
+                self.dispatch(self.records[self.position][1])
+                self.position += 1
+
+        if self.position >= len(self.records):
+            self.finished_at = time.perf_counter()
+            self.finished.emit()
+        elif self.speed is None:
+            self.timer.start(0)
+        else:
+            wait_ns = self.records[self.position][0] / self.speed - (time.perf_counter() - self.started) * 1e9
+            self.timer.start(max(0, int(wait_ns / 1e6)))
+
+
+def parse_speed(value):
+    if value == "max":
+        return None
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return speed
+
+
+def make_client(nickname):
+    client = klient.Client()
+    client.login_dialog.hide()
+    client.player_id = nickname
+    client.telemetry_dir = "off"
+    # Modal dialogs would stop an unattended replay.
+    client.server_error.disconnect()
+    client.server_error.connect(lambda message: klient.log.warning("Server error during replay: %s", message))
+    client.left_room_signal.disconnect()
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a captured TypeRacer session into the client")
+    parser.add_argument("capture")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10, ... or max (default 1)")
+    parser.add_argument("--frame-ms", type=int, default=16)
+    parser.add_argument("--drain-ms", type=int, default=500, help="keep running this long after the last line")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    app = QApplication(sys.argv[:1])
+    capture = Capture(args.capture)
+    if not capture.records:
+        print(f"{args.capture} has no records")
+        return 1
+    client = make_client(capture.nickname)
+    frames = FrameMonitor(args.frame_ms)
+    replayer = Replayer(client, capture, args.speed)
+    replayer.finished.connect(lambda: QTimer.singleShot(args.drain_ms, app.quit))
+
+    cpu_start = time.process_time()
+    frames.start()
+    replayer.start()
+    app.exec_()
+    frames.stop()
+    wall_s = replayer.finished_at - replayer.started
+    cpu_s = time.process_time() - cpu_start
+
+    paint = client.bg_widget.paint_times.summary() if client.race_view is not None else None
+    report = {
+        "capture": args.capture,
+        "nickname": capture.nickname,
+        "lines": len(capture),
+        "captured_s": round(capture.duration_ns() / 1e9, 3),
+        "speed": "max" if args.speed is None else f"{args.speed:g}x",
+        "wall_s": round(wall_s, 3),
+        "cpu_s": round(cpu_s, 3),
+        "dispatch_s": round(replayer.dispatch_s, 3),
+        "worst_dispatch_ms": round(replayer.worst_dispatch_s * 1000, 2),
+        "frames": frames.ticks,
+        "dropped_frames": frames.dropped,
+        "longest_frame_gap_ms": round(frames.longest_gap * 1000, 1),
+        "paint_ms": None if paint is None else {
+            "last": round(paint[0], 3), "mean": round(paint[1], 3),
+            "p95": round(paint[2], 3), "max": round(paint[3], 3),
+        },
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['lines']} lines ({report['captured_s']} s captured) as {capture.nickname} "
+              f"at {report['speed']} speed in {report['wall_s']} s")
+        print(f"CPU {report['cpu_s']} s including {args.drain_ms} ms drain, in dispatch {report['dispatch_s']} s "
+              f"(worst line {report['worst_dispatch_ms']} ms)")
+        print(f"frames {report['frames']}, dropped {report['dropped_frames']}, "
+              f"longest gap {report['longest_frame_gap_ms']} ms")
+        if paint is not None:
+            print(f"paint over the last {len(client.bg_widget.paint_times.values)} frames: "
+                  f"mean {paint[1]:.2f} ms, p95 {paint[2]:.2f} ms, max {paint[3]:.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -111,6 +111,7 @@ public:
             for (auto p : players) {
                 msg += p->nickname + " " + (p->isAdmin ? "1" : "0") + "|";
             }
+            msg += "\n";
             broadcast(msg, [](int){});
         }
     }
@@ -189,16 +190,26 @@ public:
 private:
     void handleClient(int clientSocket) {
         char buffer[1024];
+        std::string pending;
         while (true) {
-            int bytes = recv(clientSocket, buffer, sizeof(buffer)-1, 0);
+            int bytes = recv(clientSocket, buffer, sizeof(buffer), 0);
             if (bytes <= 0) {
                 disconnectClient(clientSocket);
                 break;
             }
-            buffer[bytes] = '\0';
-            
-            std::string request(buffer);
-            handleRequest(clientSocket, request);
+            pending.append(buffer, bytes);
+
+            size_t newline;
+            while ((newline = pending.find('\n')) != std::string::npos) {
+                std::string request = pending.substr(0, newline);
+                pending.erase(0, newline + 1);
+                if (!request.empty() && request.back() == '\r') {
+                    request.pop_back();
+                }
+                if (!request.empty()) {
+                    handleRequest(clientSocket, request);
+                }
+            }
         }
     }
 
@@ -212,7 +223,9 @@ private:
         std::cout << "[SERVER] Received command: " << cmd << " with params: " << params << std::endl;
 
         if (cmd == "LOGIN") {
-            handleLogin(clientSocket, params);
+            // Capabilities after a second '|' are not supported here; not
+            // answering CAPS| keeps the client on the text protocol.
+            handleLogin(clientSocket, params.substr(0, params.find('|')));
         }
         else if (cmd == "CREATE") {
             handleCreateRoom(clientSocket);
@@ -441,6 +454,7 @@ private:
             msg += player->nickname + " " +
                 (player->isAdmin ? "1" : "0") + "|";
         }
+        msg += "\n";
         room->broadcast(msg, [this](int socket) { disconnectClient(socket); });
     }
 
@@ -0,0 +1,429 @@
+"""Python reference implementation of the TypeRacer server.
+
+Speaks the same wire protocol as serwer.cpp but runs every connection on a
+single asyncio event loop, so the players/rooms maps are never shared
+between threads. POS| broadcasts are coalesced per room: all UPDATE|s that
+arrive in one loop iteration produce a single POS| to the room. A client
+that stops reading gets no POS| while its send buffer is above
+POSITION_HIGH_WATER, and is disconnected once the buffer passes
+MAX_WRITE_BUFFER.
+
+Run standalone (port from resources/config.conf):
+
+    python3 serwer.py
+
+or embed it, e.g. in tests and benchmarks:
+
+    server = start_in_thread(port=0)
+    ... connect to ("127.0.0.1", server.port) ...
+    server.stop()
+"""
+import sys
+import random
+import asyncio
+import threading
+
+import wire_codec
+from protocol import LineFramer, MAX_PLAYERS_PER_ROOM
+
+# Bytes waiting in a connection's send buffer.
+POSITION_HIGH_WATER = 64 * 1024
+MAX_WRITE_BUFFER = 1024 * 1024
+
+
+def read_port_from_config():
+    with open("resources/config.conf", "r") as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) == 2 and parts[0] == "port":
+                return int(parts[1])
+    raise RuntimeError("Port not found in config file")
+
+
+def read_text_from_file(number):
+    with open(f"resources/text/{number}.txt", "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class Player:
+    next_id = 0
+
+    def __init__(self, connection, nickname):
+        Player.next_id += 1
+        self.id = Player.next_id
+        self.connection = connection
+        self.nickname = nickname
+        self.car_number = 0
+        self.position = 0.0
+        self.is_admin = False
+        self.binary_positions = False
+        self.slot = 0
+
+
+class Room:
+    def __init__(self, room_id):
+        self.id = room_id
+        self.players = []
+        self.game_started = False
+        self.background_number = 1
+        self.used_car_numbers = []
+        self.finish_order = []
+        self.positions_pending = False
+
+    def add_player(self, player):
+        player.is_admin = not self.players
+        self.players.append(player)
+        self.background_number = min(4, len(self.players))
+
+    def broadcast(self, message):
+        data = message.encode()
+        for player in self.players:
+            player.connection.write(data)
+
+    def state_message(self):
+        msg = f"ROOM|{self.id}|"
+        for player in self.players:
+            msg += f"{player.nickname} {'1' if player.is_admin else '0'}|"
+        return msg + "\n"
+
+    def positions_message(self):
+        msg = "POS|"
+        for player in self.players:
+            msg += f" {player.position:.6f}|{player.nickname}"
+        return msg + "\n"
+
+    def broadcast_positions(self):
+        text = frame = None
+        for player in self.players:
+            if player.binary_positions:
+                if frame is None:
+                    frame = wire_codec.encode_positions((p.slot, p.position) for p in self.players)
+                player.connection.write_positions(frame)
+            else:
+                if text is None:
+                    text = self.positions_message().encode()
+                player.connection.write_positions(text)
+
+    def remove_player(self, player):
+        if player not in self.players:
+            return False
+        was_admin = player.is_admin
+        self.players.remove(player)
+        if was_admin and self.players:
+            self.players[0].is_admin = True
+            self.players[0].connection.write(b"ADMIN|You are now the admin\n")
+        self.broadcast(self.state_message())
+        return True
+
+
+class Connection:
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.framer = LineFramer()
+        self.closed = False
+        self.dropped_positions = 0
+
+    def write(self, data):
+        if self.closed:
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            print("[SERVER] Client is not reading, closing its connection")
+            self.abort()
+            return
+        self.writer.write(data)
+
+    def write_positions(self, data):
+        # Every POS| carries the whole room, so one that is skipped while
+        # the client catches up is replaced by the next.
+        if not self.closed and self.writer.transport.get_write_buffer_size() > POSITION_HIGH_WATER:
+            self.dropped_positions += 1
+            return
+        self.write(data)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+    def abort(self):
+        """Close without waiting for the send buffer to drain to a client that is not reading."""
+        if not self.closed:
+            self.closed = True
+            self.writer.transport.abort()
+
+    async def serve(self):
+        try:
+            while not self.closed:
+                data = await self.reader.read(4096)
+                if not data:
+                    break
+                for request in self.framer.feed(data):
+                    self.server.handle_request(self, request)
+        except ConnectionError:
+            pass
+        finally:
+            self.server.disconnect_client(self)
+
+
+class TypeRacerServer:
+    def __init__(self, rng=None):
+        self.players = {}
+        self.rooms = {}
+        self.next_room_id = 0
+        self.rng = rng or random.Random()
+        self.server = None
+        self.loop = None
+        self.connections = set()
+        self.handlers = {
+            "LOGIN": self.handle_login,
+            "CREATE": self.handle_create_room,
+            "JOIN": self.handle_join_room,
+            "START": self.handle_start_game,
+            "UPDATE": self.handle_position_update,
+            "LIST": self.handle_list,
+            "LEAVE": self.handle_leave_room,
+        }
+
+    async def start(self, host="0.0.0.0", port=0):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.accept, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Server listening on port {self.port}")
+        return self
+
+    async def accept(self, reader, writer):
+        connection = Connection(self, reader, writer)
+        self.connections.add(connection)
+        try:
+            await connection.serve()
+        finally:
+            self.connections.discard(connection)
+
+    def close(self):
+        """Stop listening and close every connection; their serve() loops then return on EOF."""
+        if self.server is not None:
+            self.server.close()
+        for connection in list(self.connections):
+            connection.abort()
+
+    def handle_request(self, connection, request):
+        if '|' not in request:
+            return
+        cmd, params = request.split('|', 1)
+        handler = self.handlers.get(cmd)
+        if handler is None:
+            return
+        if cmd != "LOGIN" and connection not in self.players:
+            return
+        handler(connection, params)
+
+    def handle_login(self, connection, params):
+        nickname, _, capabilities = params.partition("|")
+        if any(player.nickname == nickname for player in self.players.values()):
+            connection.write(b"ERROR|Nickname taken\n")
+            print(f"[SERVER] Nickname '{nickname}' is already taken. Disconnecting client.")
+            connection.close()
+            return
+        player = Player(connection, nickname)
+        self.players[connection] = player
+        print(f"[SERVER] Player '{nickname}' connected to server")
+        if wire_codec.CAPABILITY in capabilities.split(","):
+            player.binary_positions = True
+            connection.write(f"CAPS|{wire_codec.CAPABILITY}\n".encode())
+        self.send_room_list(connection)
+
+    def handle_create_room(self, connection, params):
+        room = Room(self.next_room_id)
+        self.next_room_id += 1
+        room.add_player(self.players[connection])
+        self.rooms[room.id] = room
+        connection.write(f"CREATED|{room.id}\n".encode())
+        self.broadcast_room_list()
+
+    def handle_join_room(self, connection, params):
+        try:
+            room_id = int(params)
+        except ValueError:
+            connection.write(b"ERROR|Invalid room ID\n")
+            return
+        room = self.rooms.get(room_id)
+        if room is None:
+            connection.write(b"ERROR|Invalid room\n")
+            return
+        if room.game_started:
+            connection.write(b"ERROR|Game in progress\n")
+            return
+        if len(room.players) >= MAX_PLAYERS_PER_ROOM:
+            connection.write(b"ERROR|Room full\n")
+            return
+        player = self.players[connection]
+        room.add_player(player)
+        print(f"[SERVER] Player '{player.nickname}' joined room {room_id}")
+        connection.write(f"JOIN|{room.id}\n".encode())
+        room.broadcast(room.state_message())
+
+    def handle_start_game(self, connection, params):
+        player = self.players[connection]
+        room = self.find_player_room(player)
+        if room is None or not player.is_admin:
+            return
+        room.game_started = True
+        self.assign_random_cars(room)
+
+        text = read_text_from_file(self.rng.randint(1, 10))
+        room.broadcast(f"TEXT|{text}\n")
+        msg = f"START|{len(room.players)}"
+        for slot, p in enumerate(room.players):
+            p.slot = slot
+            msg += f" {p.car_number}|{p.nickname}"
+        room.broadcast(msg + "\n")
+
+    def handle_position_update(self, connection, params):
+        try:
+            position = float(params)
+        except ValueError:
+            connection.write(b"ERROR|Invalid position\n")
+            return
+        player = self.players[connection]
+        room = self.find_player_room(player)
+        if room is None or not room.game_started:
+            return
+
+        player.position = round(position, 6)
+        if not room.positions_pending:
+            room.positions_pending = True
+            self.loop.call_soon(self.flush_positions, room)
+
+        if player.position >= 1.0 and player.nickname not in room.finish_order:
+            room.finish_order.append(player.nickname)
+            if len(room.finish_order) >= len(room.players):
+                self.flush_positions(room)
+                self.broadcast_game_end(room)
+
+    def flush_positions(self, room):
+        if room.positions_pending:
+            room.positions_pending = False
+            room.broadcast_positions()
+
+    def handle_list(self, connection, params):
+        self.send_room_list(connection)
+
+    def handle_leave_room(self, connection, params):
+        if '|' not in params:
+            return
+        _, room_id_str = params.split('|', 1)
+        try:
+            room_id = int(room_id_str)
+        except ValueError:
+            connection.write(b"ERROR|Invalid room ID\n")
+            return
+        room = self.rooms.get(room_id)
+        if room is None:
+            connection.write(b"ERROR|Invalid room\n")
+            return
+        player = self.players[connection]
+        room.remove_player(player)
+        print(f"[SERVER] Player '{player.nickname}' left room {room_id}")
+        room.broadcast(room.state_message())
+        if not room.players:
+            del self.rooms[room_id]
+            self.broadcast_room_list()
+
+    def room_list_message(self):
+        msg = "ROOMS|"
+        for room_id in sorted(self.rooms):
+            room = self.rooms[room_id]
+            names = ", ".join(p.nickname for p in room.players)
+            msg += f"Room{room.id}: {len(room.players)} [{names}]|"
+        return (msg + "\n").encode()
+
+    def send_room_list(self, connection):
+        connection.write(self.room_list_message())
+
+    def broadcast_room_list(self):
+        data = self.room_list_message()
+        for connection in self.players:
+            connection.write(data)
+
+    def find_player_room(self, player):
+        for room in self.rooms.values():
+            if player in room.players:
+                return room
+        return None
+
+    def assign_random_cars(self, room):
+        room.used_car_numbers = self.rng.sample(range(1, 13), len(room.players))
+        for player, car_number in zip(room.players, room.used_car_numbers):
+            player.car_number = car_number
+
+    def broadcast_game_end(self, room):
+        print(f"[SERVER] Game ended in room {room.id}")
+        room.broadcast("END|" + "".join(f"{nickname}|" for nickname in room.finish_order) + "\n")
+        room.game_started = False
+        room.finish_order = []
+        for player in room.players:
+            player.position = 0.0
+
+    def disconnect_client(self, connection):
+        player = self.players.pop(connection, None)
+        if player is not None:
+            print(f"[SERVER] Player '{player.nickname}' disconnected")
+            for room_id, room in list(self.rooms.items()):
+                if room.remove_player(player) and not room.players:
+                    del self.rooms[room_id]
+        connection.close()
+
+
+class ServerThread:
+    """A TypeRacerServer running on its own event loop in a daemon thread."""
+    def __init__(self, host="127.0.0.1", port=0):
+        self.loop = asyncio.new_event_loop()
+        self.server = TypeRacerServer()
+        self.started = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(host, port), daemon=True)
+
+    def run(self, host, port):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.start(host, port))
+        self.port = self.server.port
+        self.started.set()
+        self.loop.run_forever()
+
+    async def shutdown(self):
+        self.server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if not tasks:
+            return
+        # Closed connections finish on their own; only a task that is still
+        # running after that gets cancelled.
+        _, pending = await asyncio.wait(tasks, timeout=1)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result(timeout=2)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+
+
+def start_in_thread(host="127.0.0.1", port=0):
+    server = ServerThread(host, port)
+    server.thread.start()
+    server.started.wait()
+    return server
+
+
+async def main():
+    server = await TypeRacerServer().start("0.0.0.0", read_port_from_config())
+    async with server.server:
+        await server.server.serve_forever()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        sys.exit(0)
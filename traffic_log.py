@@ -0,0 +1,86 @@
+import time
+import struct
+import threading
+
+# Traffic capture layout (little-endian):
+#   header  magic, version, nickname_length, started_at_ns (time.time_ns), nickname utf-8
+#   records delta_us since the previous record (time.monotonic_ns), length, line utf-8
+# Lines are stored as handed to dispatch, without the trailing newline.
+HEADER = struct.Struct('<4sHHq')
+RECORD = struct.Struct('<II')
+MAGIC = b'TRTC'
+VERSION = 1
+MAX_DELTA_US = 0xFFFFFFFF
+
+
+class TrafficCapture:
+    """Appends every inbound server line with its arrival time to a capture file."""
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.last_ns = None
+        self.count = 0
+        # The reader thread records while the GUI thread may close on quit.
+        self.lock = threading.Lock()
+
+    def open(self, nickname):
+        """Start the capture for a login as nickname, replacing what an earlier login attempt wrote."""
+        self.close()
+        name = nickname.encode()
+        with self.lock:
+            self.count = 0
+            self.file = open(self.path, 'wb', buffering=1 << 16)
+            self.file.write(HEADER.pack(MAGIC, VERSION, len(name), time.time_ns()) + name)
+            self.last_ns = time.monotonic_ns()
+
+    def record(self, line):
+        if self.file is None:
+            return
+        now = time.monotonic_ns()
+        data = line.encode()
+        with self.lock:
+            if self.file is None:
+                return
+            delta_us = min((now - self.last_ns) // 1000, MAX_DELTA_US)
+            # Keep the remainder so rounding to microseconds does not drift over a session.
+            self.last_ns += delta_us * 1000
+            self.file.write(RECORD.pack(delta_us, len(data)) + data)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class Capture:
+    """A capture file read back: nickname, start time and (offset_ns, line) records."""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a traffic capture")
+        magic, version, name_length, self.started_at_ns = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a traffic capture")
+        offset = HEADER.size
+        self.nickname = data[offset:offset + name_length].decode()
+        offset += name_length
+
+        self.records = []
+        elapsed_ns = 0
+        while offset + RECORD.size <= len(data):
+            delta_us, length = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if offset + length > len(data):
+                break  # truncated by a crash mid-write
+            elapsed_ns += delta_us * 1000
+            self.records.append((elapsed_ns, data[offset:offset + length].decode()))
+            offset += length
+
+    def __len__(self):
+        return len(self.records)
+
+    def duration_ns(self):
+        return self.records[-1][0] if self.records else 0
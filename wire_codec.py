@@ -0,0 +1,117 @@
+"""Compact binary POS| frames, negotiated at login.
+
+A client that wants them logs in with LOGIN|<nickname>|bin1. A server that
+supports them answers CAPS|bin1 before its first ROOMS| and from then on
+sends that client position broadcasts as binary frames instead of POS|
+lines. Every other message stays a text line. A server that does not answer
+CAPS| keeps the connection on text.
+
+Frames never start with a byte a text line can start with, so text lines
+and frames share one stream:
+
+    header   marker 0x00, frame type, payload length (uint16)
+    FRAME_POS payload, one entry per player:
+             slot (uint8, index of the player in that race's START| list),
+             progress (uint16 fixed point, 0..65535 for 0.0..1.0)
+"""
+import struct
+
+from protocol import LineFramer
+
+CAPABILITY = "bin1"
+FRAME_MARKER = 0x00
+FRAME_POS = 0x01
+HEADER = struct.Struct('<BBH')
+POS_ENTRY_SIZE = 3
+PROGRESS_SCALE = 0xFFFF
+
+# One Struct per player count packs or unpacks a whole frame in a single call.
+pos_frames = {}
+pos_payloads = {}
+
+
+def pos_frame_struct(count):
+    frame = pos_frames.get(count)
+    if frame is None:
+        frame = pos_frames[count] = struct.Struct('<BBH' + 'BH' * count)
+    return frame
+
+
+def pos_payload_struct(count):
+    payload = pos_payloads.get(count)
+    if payload is None:
+        payload = pos_payloads[count] = struct.Struct('<' + 'BH' * count)
+    return payload
+
+
+def quantize_progress(progress):
+    if progress <= 0.0:
+        return 0
+    if progress >= 1.0:
+        return PROGRESS_SCALE
+    return int(progress * PROGRESS_SCALE + 0.5)
+
+
+def encode_positions(entries):
+    """One FRAME_POS frame for (slot, progress) pairs."""
+    values = []
+    for slot, progress in entries:
+        values.append(slot)
+        values.append(quantize_progress(progress))
+    count = len(values) // 2
+    return pos_frame_struct(count).pack(FRAME_MARKER, FRAME_POS, count * POS_ENTRY_SIZE, *values)
+
+
+def decode_positions(payload, offset=0, length=None):
+    """(slot, progress) pairs of a FRAME_POS payload."""
+    count = (len(payload) - offset if length is None else length) // POS_ENTRY_SIZE
+    values = pos_payload_struct(count).unpack_from(payload, offset)
+    return list(zip(values[0::2], [fixed / PROGRESS_SCALE for fixed in values[1::2]]))
+
+
+class PositionFrame(list):
+    """Decoded FRAME_POS: (slot, progress) pairs, handed out by WireFramer next to text lines."""
+
+
+class WireFramer(LineFramer):
+    """LineFramer that also takes binary frames out of the stream.
+
+    Text lines never contain a 0x00 byte, so everything up to the next frame
+    marker is split into lines the way LineFramer does it. A stream without
+    frames costs one extra find().
+    """
+    def feed(self, data):
+        self.buffer += data
+        if self.buffer.find(FRAME_MARKER) < 0:
+            return super().feed(b"")
+
+        messages = []
+        start = 0
+        buffer = self.buffer
+        size = len(buffer)
+        while start < size:
+            if buffer[start] != FRAME_MARKER:
+                # Text up to the next frame, or up to the last complete line.
+                end = buffer.find(FRAME_MARKER, start)
+                if end < 0:
+                    end = buffer.rfind(b'\n', start) + 1
+                    if end <= start:
+                        break
+                for line in bytes(buffer[start:end]).split(b'\n'):
+                    line = line.decode('utf-8', errors='replace').strip()
+                    if line:
+                        messages.append(line)
+                start = end
+                continue
+            if size - start < HEADER.size:
+                break
+            _, frame_type, length = HEADER.unpack_from(buffer, start)
+            end = start + HEADER.size + length
+            if end > size:
+                break
+            if frame_type == FRAME_POS:
+                values = pos_payload_struct(length // POS_ENTRY_SIZE).unpack_from(buffer, start + HEADER.size)
+                messages.append(PositionFrame(zip(values[0::2], [fixed / PROGRESS_SCALE for fixed in values[1::2]])))
+            start = end
+        del buffer[:start]
+        return messages